@@ -22,8 +22,14 @@ import calendar
 import pytz
 import urllib
 import base64
+import binascii
 import xlwt
 import datetime
+import json
+import zlib
+import hashlib
+import time
+from email.utils import formatdate
 from dateutil.parser import parse
 
 from zope.security.proxy import removeSecurityProxy
@@ -92,12 +98,24 @@ from schooltool.securitypolicy.crowds import inCrowd
 
 from schooltool.lyceum.journal.journal import getCurrentSectionTaught
 from schooltool.lyceum.journal.journal import setCurrentSectionTaught
+from schooltool.lyceum.journal.journal import getInstructorNavigation
+from schooltool.lyceum.journal.journal import getNumericalValue
+from schooltool.lyceum.journal.journal import tallyAttendance
+from schooltool.lyceum.journal.journal import ScoredMeeting
+from schooltool.lyceum.journal.journal import querySectionJournalData
+from schooltool.lyceum.journal.cache import gradebook_fragments
+from schooltool.lyceum.journal.cache import scored_meetings
 from schooltool.lyceum.journal.journal import getCurrentJournalMode
 from schooltool.lyceum.journal.journal import setCurrentJournalMode
 from schooltool.lyceum.journal.journal import getCurrentEnrollmentMode
 from schooltool.lyceum.journal.journal import setCurrentEnrollmentMode
 from schooltool.lyceum.journal.journal import JournalPDFReportTask
 from schooltool.lyceum.journal.journal import JournalXLSReportTask
+from schooltool.lyceum.journal.journal import XLSXReportTask
+from schooltool.lyceum.journal.journal import ZipReportTask
+from schooltool.lyceum.journal.spreadsheet import sheetName
+from schooltool.lyceum.journal.spreadsheet import XLSXWorkbook
+from schooltool.lyceum.journal.spreadsheet import CSVZipWorkbook
 from schooltool.lyceum.journal.journal import PersistentAttendanceScoreSystem
 from schooltool.lyceum.journal.journal import GradeRequirement
 from schooltool.lyceum.journal.journal import AttendanceRequirement
@@ -131,6 +149,83 @@ def makeSchoolAttendanceMeeting(date):
     return meeting
 
 
+def getPeriodTitle(meeting, length=None):
+    """Title of the period of a meeting, without the trailing colon."""
+    try:
+        if meeting.period is not None:
+            title = meeting.period.title
+        else:
+            title = ''
+        if length is not None:
+            title = title[:length]
+        if title[-1] == ':':
+            title = title[:-1]
+    except:
+        title = ''
+    return title
+
+
+def parseActivityId(activity_id):
+    """Start of a school attendance activity from its id.
+
+    Returns None if the id is missing or not valid.
+    """
+    if activity_id is None:
+        return None
+    try:
+        dts = base64.decodestring(activity_id.strip())
+        if not dts.strip():
+            return None
+        return parse(dts)
+    except (binascii.Error, ValueError, OverflowError):
+        return None
+
+
+def getValidScores(score_system):
+    """Return the sorted list of valid values of a score system."""
+    if IAttendanceScoreSystem.providedBy(score_system):
+        return sorted(score_system.lookup.scores)
+    return sorted([score[0] for score in score_system.scores])
+
+
+def getScoresVersion(values):
+    """Return a short version string of a list of valid score values."""
+    data = u'\n'.join([unicode(value) for value in values])
+    return '%08x' % (zlib.crc32(data.encode('UTF-8')) & 0xffffffff)
+
+
+def validateScores(score_system, scores):
+    """Return the scores that are not valid in the score system.
+
+    Empty scores are valid, they clear the cell.
+    """
+    invalid = []
+    for score in scores:
+        if not isinstance(score, basestring):
+            invalid.append(score)
+        elif score.strip() and not score_system.isValidScore(score):
+            invalid.append(score)
+    return invalid
+
+
+def splitCellId(cell_id, meetings, members):
+    """Split a gradebook cell id into its meeting and member.
+
+    Cell ids are "<meeting name>_<username>", and both parts may contain
+    underscores, so every split is tried against the meetings and
+    members dicts keyed by name.  Returns (meeting, person) or None.
+    """
+    pos = cell_id.find('_')
+    while pos >= 0:
+        meeting = meetings.get(cell_id[:pos])
+        if meeting is not None:
+            person = members.get(cell_id[pos+1:])
+            if person is not None:
+                return meeting, person
+        pos = cell_id.find('_', pos + 1)
+    return None
+
+
 class SectionFinder(object):
 
     def getFromYear(self, sections, active):
@@ -216,6 +311,36 @@ class GradesColumn(object):
                 grades.append(score)
         return grades
 
+    def getTotals(self, person):
+        """Get running score totals of the person in the term.
+
+        Returns None if the journal does not keep totals for the term.
+        """
+        if not ISectionJournal.providedBy(self.journal):
+            return None
+        section = removeSecurityProxy(self.journal.section)
+        if ITerm(section) is not removeSecurityProxy(self.term):
+            return None
+        return self.journal.getStudentTotals(person)
+
+    def getAttendanceTally(self, person):
+        """Get the attendance tally of the person in the term.
+
+        Tallies of all members of the journal are counted at once.
+        Returns None if the journal is not a section journal.
+        """
+        if not ISectionJournal.providedBy(self.journal):
+            return None
+        tallies = getattr(self, '_attendance_tallies', None)
+        if tallies is None:
+            journal = removeSecurityProxy(self.journal)
+            first = last = None
+            if ITerm(journal.section) is not removeSecurityProxy(self.term):
+                first, last = self.term.first, self.term.last
+            tallies = self._attendance_tallies = journal.tallyAttendance(
+                journal.members, first=first, last=last)
+        return tallies.get(removeSecurityProxy(person).__name__)
+
 
 class PersonGradesColumn(GradesColumn):
     implements(ISelectableColumn, IIndependentColumn)
@@ -346,13 +471,19 @@ class SectionTermAverageGradesColumn(GradesColumn):
         self.journal = journal
 
     def renderCell(self, person, formatter):
+        totals = self.getTotals(person)
+        if totals is not None:
+            total, count = totals.grades()
+            if not count:
+                return ""
+            return "%.3f" % (float(total) / float(count))
         grades = []
         for score in self.getGrades(person):
             grade = score.value
             if grade is UNSCORED:
                 continue
             try:
-                grade = score.scoreSystem.getNumericalValue(grade)
+                grade = getNumericalValue(score.scoreSystem, grade)
             except KeyError:
                 continue
             grades.append(grade)
@@ -375,11 +506,15 @@ class SectionTermAttendanceColumn(GradesColumn):
         self.journal = journal
 
     def renderCell(self, person, formatter):
-        absences = 0
-        for score in self.getAbsences(person):
-            if (IAttendanceScoreSystem.providedBy(score.scoreSystem) and
-                score.scoreSystem.isAbsent(score)):
-                absences += 1
+        tally = self.getAttendanceTally(person)
+        if tally is not None:
+            absences = tally.absent
+        else:
+            absences = 0
+            for score in self.getAbsences(person):
+                if (IAttendanceScoreSystem.providedBy(score.scoreSystem) and
+                    score.scoreSystem.isAbsent(score)):
+                    absences += 1
         if absences == 0:
             return ""
         else:
@@ -399,11 +534,15 @@ class SectionTermTardiesColumn(GradesColumn):
         self.journal = journal
 
     def renderCell(self, person, formatter):
-        tardies = 0
-        for score in self.getAbsences(person):
-            if (IAttendanceScoreSystem.providedBy(score.scoreSystem) and
-                score.scoreSystem.isTardy(score)):
-                tardies += 1
+        tally = self.getAttendanceTally(person)
+        if tally is not None:
+            tardies = tally.tardy
+        else:
+            tardies = 0
+            for score in self.getAbsences(person):
+                if (IAttendanceScoreSystem.providedBy(score.scoreSystem) and
+                    score.scoreSystem.isTardy(score)):
+                    tardies += 1
         if tardies == 0:
             return ""
         else:
@@ -422,19 +561,23 @@ class SectionTermExcusedColumn(GradesColumn):
         self.journal = journal
 
     def renderCell(self, person, formatter):
-        excusable = 0
-        excused = 0
-        for score in self.getAbsences(person):
-            if (score.value is UNSCORED or
-                not IAttendanceScoreSystem.providedBy(score.scoreSystem)):
-                continue
-            ss = score.scoreSystem
-            if (ss.isAbsent(score) or
-                ss.isTardy(score) or
-                ss.isExcused(score)):
-                excusable += 1
-            if ss.isExcused(score):
-                excused += 1
+        tally = self.getAttendanceTally(person)
+        if tally is not None:
+            excused, excusable = tally.excused, tally.excusable
+        else:
+            excusable = 0
+            excused = 0
+            for score in self.getAbsences(person):
+                if (score.value is UNSCORED or
+                    not IAttendanceScoreSystem.providedBy(score.scoreSystem)):
+                    continue
+                ss = score.scoreSystem
+                if (ss.isAbsent(score) or
+                    ss.isTardy(score) or
+                    ss.isExcused(score)):
+                    excusable += 1
+                if ss.isExcused(score):
+                    excused += 1
         if excusable == 0:
             return ""
         else:
@@ -523,16 +666,8 @@ class LyceumSectionJournalView(StudentSelectionMixin):
         if not term:
             return ()
 
-        # maybe expand would be better in here
-        by_uid = dict([(removeSecurityProxy(e).unique_id, e)
-                       for e in self.context.meetings])
-
-        insecure_events = [removeSecurityProxy(e)
-                           for e in by_uid.values()]
-        insecure_events[:] = filter(lambda e: self.isJournalMeeting(term, e),
-                                    insecure_events)
-        meetings = [by_uid[e.unique_id] for e in sorted(insecure_events)]
-        return meetings
+        return [event for event in self.context.meetings
+                if self.isJournalMeeting(term, removeSecurityProxy(event))]
 
     @Lazy
     def all_meetings(self):
@@ -725,11 +860,11 @@ class SectionJournalAjaxView(BrowserView):
         try:
             self.context.setGrade(person, meeting, grade, evaluator=evaluator)
         except ScoreValidationError:
-            pass
-        try:
-            self.context.setAbsence(person, meeting, evaluator=evaluator, value=grade)
-        except ScoreValidationError:
-            pass
+            try:
+                self.context.setAbsence(
+                    person, meeting, evaluator=evaluator, value=grade)
+            except ScoreValidationError:
+                pass
 
         return ""
 
@@ -787,9 +922,9 @@ class JournalNavViewlet(flourish.page.LinkViewlet, SectionListView):
         if inCrowd(self.request.principal, 'clerks',
                    context=self.context):
             return True
-        taught_sections = list(self.getSectionsForPerson(person))
-        learner_sections = list(ILearner(person).sections())
-        return taught_sections or learner_sections
+        if self.getSectionsForPerson(person):
+            return True
+        return bool(list(ILearner(person).sections()))
 
     @property
     def url(self):
@@ -799,7 +934,7 @@ class JournalNavViewlet(flourish.page.LinkViewlet, SectionListView):
         return '%s/journal.html' % base_url
 
     def getSectionsForPerson(self, person):
-        return list(IInstructor(person).sections())
+        return getInstructorNavigation(person).sections
 
 
 class StudentGradebookTabViewlet(object):
@@ -818,11 +953,13 @@ class FlourishLyceumSectionJournalBase(flourish.page.WideContainerPage,
     no_periods = False
     render_journal = True
     journal_mode = None
+    not_modified = False
 
     no_periods_text = _("No periods have been assigned in timetables of this section.")
 
     def __init__(self, *args, **kw):
-        self._grade_cache = {}
+        self._indexed_scores = {}
+        self._homeroom_hints = {}
         super(FlourishLyceumSectionJournalBase, self).__init__(*args, **kw)
 
     @property
@@ -868,6 +1005,100 @@ class FlourishLyceumSectionJournalBase(flourish.page.WideContainerPage,
         app = ISchoolToolApplication(None)
         self.tzinfo = pytz.timezone(IApplicationPreferences(app).timezone)
 
+        if ('UPDATE_SUBMIT' not in self.request and
+            self.request.method in ('GET', 'HEAD')):
+            self.checkNotModified()
+
+    def getGridStamps(self):
+        """Stamps of everything the grid of the month depends on.
+
+        Returns (journal name, stamps), or None if the journal was never
+        stored, as its membership changes are not stamped.
+        """
+        section = removeSecurityProxy(self.context.section)
+        journal = querySectionJournalData(section)
+        if journal is None:
+            return None
+        app = ISchoolToolApplication(None)
+        container = app['schooltool.lyceum.journal']
+        ss = self.getDefaultScoreSystem()
+        scores_version = None
+        if ss is not None:
+            scores_version = getScoresVersion(getValidScores(ss))
+        term = self.selected_term
+        stamps = (journal.change_stamp,
+                  journal.getCalendarStamp(),
+                  container.activity_stamp,
+                  container.getHomeroomStamp(getattr(term, 'first', None),
+                                             getattr(term, 'last', None)),
+                  self.journal_mode,
+                  self.active_month,
+                  getattr(term, '__name__', None),
+                  getattr(ss, '__name__', None),
+                  scores_version,
+                  str(self.request.locale.id.language),
+                  getUtility(IDateManager).today)
+        return journal.__name__, stamps
+
+    def getGridETag(self):
+        """Entity tag of the grid page, None if the page is not cached.
+
+        The tag changes with the grid stamps, the user and request
+        parameters.
+        """
+        grid_stamps = self.getGridStamps()
+        if grid_stamps is None:
+            return None
+        enrollment_mode = getCurrentEnrollmentMode(
+            IPerson(self.request.principal, None))
+        parts = (grid_stamps,
+                 self.request.principal.id,
+                 enrollment_mode,
+                 sorted(self.request.form.items()))
+        return '"%s"' % hashlib.md5(repr(parts)).hexdigest()
+
+    def getTableFragmentKey(self):
+        """Key of the rendered gradebook table in the fragment cache.
+
+        None if the table should not be cached.
+        """
+        grid_stamps = self.getGridStamps()
+        if grid_stamps is None:
+            return None
+        name, stamps = grid_stamps
+        enrollment_mode = getCurrentEnrollmentMode(
+            IPerson(self.request.principal, None))
+        return (name, stamps,
+                self.request.get('sort_by'),
+                enrollment_mode,
+                self.request.getApplicationURL())
+
+    def checkNotModified(self):
+        etag = self.getGridETag()
+        if etag is None:
+            return
+        response = self.request.response
+        response.setHeader('ETag', etag)
+        response.setHeader('Cache-Control', 'private, no-cache')
+        journal = querySectionJournalData(
+            removeSecurityProxy(self.context.section))
+        if journal.changed_on is not None:
+            response.setHeader('Last-Modified',
+                               formatdate(journal.changed_on, usegmt=True))
+        if_none_match = self.request.getHeader('If-None-Match')
+        if not if_none_match:
+            return
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        if etag in tags or '*' in tags:
+            response.setStatus(304)
+            self.not_modified = True
+
+    def render(self, *args, **kw):
+        if self.not_modified:
+            return ''
+        return super(FlourishLyceumSectionJournalBase, self).render(
+            *args, **kw)
+
     @Lazy
     def activities(self):
         result = []
@@ -881,21 +1112,10 @@ class FlourishLyceumSectionJournalBase(flourish.page.WideContainerPage,
                 'cssClass': 'scorable',
                 'scores': scores,
                 }
-            insecure_meeting = removeSecurityProxy(meeting)
-            meetingDate = insecure_meeting.dtstart.astimezone(self.tzinfo).date()
+            meetingDate = self.localStart(meeting).date()
             info['shortTitle'] = meetingDate.strftime("%d")
             info['longTitle'] = meetingDate.strftime("%Y-%m-%d")
-            try:
-                if meeting.period is not None:
-                    short_title = meeting.period.title[:3]
-                else:
-                    short_title = ''
-                period = short_title
-                if period[-1] == ':':
-                    period = period[:-1]
-            except:
-                period = ''
-            info['period'] = period
+            info['period'] = getPeriodTitle(meeting, 3)
             result.append(info)
         return result
 
@@ -905,6 +1125,33 @@ class FlourishLyceumSectionJournalBase(flourish.page.WideContainerPage,
     def makeRequirement(self, meeting):
         return None
 
+    def getScoreOptions(self, scoresystem):
+        """Return a list of {'label', 'value'} of scores to choose from."""
+        return []
+
+    def getJSONScores(self, scoresystem):
+        encoder = flourish.tal.JSONEncoder()
+        return encoder.encode(self.getScoreOptions(scoresystem))
+
+    @Lazy
+    def score_manifest(self):
+        """JSON manifest of valid scores, so the browser can validate them.
+
+        The version changes whenever the valid scores change.
+        """
+        ss = self.getDefaultScoreSystem()
+        if ss is None:
+            return None
+        values = getValidScores(ss)
+        manifest = {
+            'version': getScoresVersion(values),
+            'ignoreCase': IAttendanceScoreSystem.providedBy(ss),
+            'values': values,
+            'scores': self.getScoreOptions(ss),
+            }
+        encoder = flourish.tal.JSONEncoder()
+        return encoder.encode(manifest)
+
     def getSelectedTerm(self):
         term = ITerm(self.context.section)
         if term in self.scheduled_terms:
@@ -926,15 +1173,110 @@ class FlourishLyceumSectionJournalBase(flourish.page.WideContainerPage,
         return _('You have some changes that have not been saved.  Click OK to save now or CANCEL to continue without saving.')
 
     @Lazy
-    def meetings(self):
-        result = []
+    def meeting_index(self):
+        section = removeSecurityProxy(self.context.section)
+        return ISectionJournalData(section).getMeetingIndex(self.timezone)
+
+    def localStart(self, meeting):
+        """Start of the meeting in the application timezone."""
+        meeting = removeSecurityProxy(meeting)
+        index = self.meeting_index
+        if index is not None:
+            return index.localStart(meeting)
+        return meeting.dtstart.astimezone(self.timezone)
+
+    def isJournalMeeting(self, term, meeting):
+        return self.localStart(meeting).date() in term
+
+    def allMeetings(self):
+        term = removeSecurityProxy(self.selected_term)
+        if not term:
+            return ()
+        index = self.meeting_index
+        if index is None:
+            return LyceumSectionJournalView.allMeetings(self)
+        return [event for event in index.meetings
+                if self.isJournalMeeting(term, event)]
+
+    @Lazy
+    def month_index(self):
+        """Journal meetings grouped by their local (year, month).
+
+        Every meeting is converted to local time once.
+        """
+        months = {}
         for event in self.all_meetings:
-            insecure_event = removeSecurityProxy(event)
-            meeting_start = insecure_event.dtstart.astimezone(self.timezone)
-            if meeting_start.month == self.active_month:
-                result.append(event)
+            start = self.localStart(event)
+            months.setdefault((start.year, start.month), []).append(event)
+        return months
+
+    @Lazy
+    def term_months(self):
+        return sorted(self.month_index)
+
+    def getMonthMeetings(self, month):
+        result = []
+        for year, month_id in self.term_months:
+            if month_id == month:
+                result.extend(self.month_index[year, month_id])
         return result
 
+    def monthsInSelectedTerm(self):
+        month = -1
+        for year, month_id in self.term_months:
+            if month_id != month:
+                yield month_id
+                month = month_id
+
+    @Lazy
+    def active_year(self):
+        event = self.selectedEvent()
+        if event:
+            return event.dtstart.year
+        available_months = list(self.selected_months)
+        selected_month = None
+        try:
+            month = int(self.request.get('month'))
+        except (TypeError, ValueError):
+            pass
+        else:
+            if month in available_months:
+                selected_month = month
+        if not selected_month:
+            selected_month = available_months[0]
+        for year, month_id in self.term_months:
+            if month_id == selected_month:
+                return year
+
+    @Lazy
+    def meetings(self):
+        return self.getMonthMeetings(self.active_month)
+
+    def validate_scores(self, scores=None):
+        """Validate a batch of scores.  Intended to be used from AJAX calls.
+
+        Scores are posted as a JSON list.  Returns the version of the
+        score manifest and the scores that are not valid.
+        """
+        if scores is None:
+            scores = self.request.get('scores')
+        try:
+            scores = json.loads(scores or '[]')
+        except ValueError:
+            scores = []
+        if not isinstance(scores, list):
+            scores = []
+        result = {'version': None,
+                  'invalid': []}
+        ss = self.getDefaultScoreSystem()
+        if ss is not None:
+            result['version'] = getScoresVersion(getValidScores(ss))
+            result['invalid'] = validateScores(ss, scores)
+        response = self.request.response
+        response.setHeader('Content-Type', 'application/json')
+        encoder = flourish.tal.JSONEncoder()
+        return encoder.encode(result)
+
     def validate_score(self, activity_id=None, score=None):
         """Intended to be used from AJAX calls."""
         if score is None:
@@ -945,15 +1287,16 @@ class FlourishLyceumSectionJournalBase(flourish.page.WideContainerPage,
                   'is_extracredit': False}
 
         meeting = None
-        meetings = dict([(meeting.__name__, meeting)
-                         for meeting in self.context.meetings])
-        if activity_id is not None and activity_id in meetings:
-            meeting = meetings[activity_id]
+        if activity_id is not None and self.meeting_index is not None:
+            try:
+                meeting = self.meeting_index.find(activity_id)
+            except KeyError:
+                pass
         if (meeting is not None and
             score and score.strip()):
-            requirement = self.makeRequirement(meeting)
-            if requirement is not None:
-                result['is_valid'] = requirement.score_system.isValidScore(score)
+            ss = self.getDefaultScoreSystem()
+            if ss is not None:
+                result['is_valid'] = ss.isValidScore(score)
 
         response = self.request.response
         response.setHeader('Content-Type', 'application/json')
@@ -961,33 +1304,121 @@ class FlourishLyceumSectionJournalBase(flourish.page.WideContainerPage,
         json = encoder.encode(result)
         return json
 
-    def getScores(self, person):
-        if person in self._grade_cache:
-            return list(self._grade_cache[person])
-        self._grade_cache[person] = result = []
-        unique_meetings = set()
+    def iterEvaluations(self, person):
+        """Yield (requirement, evaluation) of the person in the term."""
         term = self.selected_term
-        calendar = ISchoolToolCalendar(self.context.section)
-        events = [e for e in calendar if e.dtstart.date() in term]
-        sorted_events = sorted(events, key=lambda e: e.dtstart)
         unproxied_person = removeSecurityProxy(person)
-        for event in sorted_events:
+        for event in self.meeting_index.meetings:
             if event.dtstart.date() not in term:
                 continue
-            unproxied_event = removeSecurityProxy(event)
-            requirement = self.makeRequirement(unproxied_event)
+            requirement = self.makeRequirement(event)
             score = IEvaluateRequirement(requirement).getEvaluation(
                     unproxied_person, requirement, default=UNSCORED)
-            if (event.meeting_id not in unique_meetings and
-                score is not UNSCORED):
-                result.append(score)
-                unique_meetings.add(event.meeting_id)
+            if score is not UNSCORED:
+                yield requirement, score
+
+    def getScoreCacheKey(self, person):
+        """Key of scored meetings of the person in the score cache.
+
+        None if the scores should not be cached.
+        """
+        section = removeSecurityProxy(self.context.section)
+        journal = querySectionJournalData(section)
+        ss = self.getDefaultScoreSystem()
+        if journal is None or ss is None:
+            return None
+        app = ISchoolToolApplication(None)
+        container = app['schooltool.lyceum.journal']
+        term = self.selected_term
+        return (journal.__name__,
+                getattr(term, '__name__', None),
+                person.__name__,
+                self.journal_mode,
+                getattr(ss, '__name__', None),
+                getScoresVersion(getValidScores(ss)),
+                journal.change_stamp,
+                journal.getCalendarStamp(),
+                container.getHomeroomStamp(getattr(term, 'first', None),
+                                           getattr(term, 'last', None)))
+
+    def getScores(self, person):
+        """Return a tuple of ScoredMeeting of the person in the term.
+
+        Scores are kept in a process level cache, shared by requests.
+        """
+        key = self.getScoreCacheKey(person)
+        if key is not None:
+            cached = scored_meetings.get(key)
+            if cached is not None:
+                return cached
+        result = tuple([ScoredMeeting(requirement, score)
+                        for requirement, score in self.iterEvaluations(person)])
+        if key is not None:
+            scored_meetings.set(key, result)
         return result
 
-    def getGrade(self, person, meeting):
+    @Lazy
+    def journal_data(self):
+        """Section journal data that stores scores of this journal mode.
+
+        None if scores of this mode are stored elsewhere.
+        """
+        if not self.all_meetings:
+            return None
+        meeting = removeSecurityProxy(self.all_meetings[0])
         requirement = self.makeRequirement(meeting)
-        score = IEvaluateRequirement(requirement).getEvaluation(
+        if requirement is None:
+            return None
+        journal = removeSecurityProxy(IEvaluateRequirement(requirement))
+        if not ISectionJournalData.providedBy(journal):
+            return None
+        return journal
+
+    def getStudentTotals(self, person):
+        """Running score totals of the person in the selected term."""
+        journal = self.journal_data
+        if journal is None or self.selected_term is None:
+            return None
+        return journal.getStudentTotals(removeSecurityProxy(person))
+
+    def getIndexedScores(self, meetings):
+        """Read scores of the meetings with one scan of the journal index.
+
+        Returns (first, last, scores) or None if scores of this journal
+        mode are not indexed in the section journal.
+        """
+        journal = self.journal_data
+        if journal is None:
+            return None
+        requirements = [self.makeRequirement(removeSecurityProxy(meeting))
+                        for meeting in meetings]
+        if not requirements:
+            return None
+        first = min([requirement.date for requirement in requirements])
+        last = max([requirement.date for requirement in requirements])
+        scores = journal.getScores(
+            requirements[0].requirement_type, first=first, last=last)
+        if scores is None:
+            return None
+        return first, last, scores
+
+    def getMeetingEvaluation(self, person, requirement):
+        month = self.active_month
+        if month not in self._indexed_scores:
+            self._indexed_scores[month] = self.getIndexedScores(self.meetings)
+        indexed = self._indexed_scores[month]
+        if indexed is not None:
+            first, last, scores = indexed
+            if first <= requirement.date <= last:
+                meeting_scores = scores.get(
+                    (requirement.date, requirement.meeting_id), {})
+                return meeting_scores.get(person.__name__, UNSCORED)
+        return IEvaluateRequirement(requirement).getEvaluation(
             person, requirement, default=UNSCORED)
+
+    def getGrade(self, person, meeting):
+        requirement = self.makeRequirement(meeting)
+        score = self.getMeetingEvaluation(person, requirement)
         if score is UNSCORED:
             return None
         grade = score.value
@@ -995,8 +1426,89 @@ class FlourishLyceumSectionJournalBase(flourish.page.WideContainerPage,
             return None
         return score.value
 
+    def getExportStudents(self):
+        """Members listed in exports, as in the grid of the enrollment mode."""
+        students = self.members()
+        if IPersonContainer.providedBy(self.context):
+            return students
+        today = getUtility(IDateManager).today
+        active_students = students.on(today).any(ACTIVE)
+        current_mode = getCurrentEnrollmentMode(
+            IPerson(self.request.principal, None))
+        if current_mode in (None, 'gradebook-enrollment-mode-enrolled'):
+            return active_students
+        return students
+
+    def iterExportRows(self, meetings):
+        """Yield an ExportRow of every student listed in exports.
+
+        Only plain values are read, with one scan of the journal index
+        for all the meetings.  Nothing of the grid presentation is
+        computed.
+        """
+        meetings = [removeSecurityProxy(meeting) for meeting in meetings]
+        requirements = [self.makeRequirement(meeting) for meeting in meetings]
+        indexed = self.getIndexedScores(meetings)
+        if indexed is not None:
+            first, last, scores = indexed
+            meeting_scores = [
+                scores.get((requirement.date, requirement.meeting_id), {})
+                for requirement in requirements]
+        for person in self.getExportStudents():
+            person = removeSecurityProxy(person)
+            values = []
+            for n, requirement in enumerate(requirements):
+                if indexed is not None:
+                    score = meeting_scores[n].get(person.__name__, UNSCORED)
+                else:
+                    score = IEvaluateRequirement(requirement).getEvaluation(
+                        person, requirement, default=UNSCORED)
+                if score is UNSCORED or score.value is UNSCORED:
+                    values.append('')
+                else:
+                    values.append(score.value)
+            yield ExportRow(person.__name__,
+                            person.first_name,
+                            person.last_name,
+                            IDemographics(person).get('ID', ''),
+                            values)
+
+    def getHomeroomHints(self, meetings):
+        """Read homeroom attendance of members on dates of the meetings.
+
+        Returns (dates, usernames, hints) where hints maps
+        (username, date) to the homeroom score.
+        """
+        requirements = {}
+        for meeting in meetings:
+            meeting = removeSecurityProxy(meeting)
+            date = meeting.dtstart.date()
+            if date not in requirements:
+                requirements[date] = HomeroomRequirement(meeting)
+        hints = {}
+        usernames = set()
+        if not requirements:
+            return frozenset(), usernames, hints
+        for person in self.members():
+            person = removeSecurityProxy(person)
+            usernames.add(person.__name__)
+            evaluations = removeSecurityProxy(IEvaluations(person))
+            for date, requirement in requirements.items():
+                score = evaluations.get(requirement)
+                if score is None or score.value is UNSCORED:
+                    continue
+                hints[person.__name__, date] = score.value
+        return frozenset(requirements), usernames, hints
+
     def getHint(self, person, meeting):
         # grade hint is homeroom attendance by default
+        month = self.active_month
+        if month not in self._homeroom_hints:
+            self._homeroom_hints[month] = self.getHomeroomHints(self.meetings)
+        dates, usernames, hints = self._homeroom_hints[month]
+        date = meeting.dtstart.date()
+        if date in dates and person.__name__ in usernames:
+            return hints.get((person.__name__, date))
         requirement = HomeroomRequirement(meeting)
         score = IEvaluateRequirement(requirement).getEvaluation(
             person, requirement, default=UNSCORED)
@@ -1005,6 +1517,162 @@ class FlourishLyceumSectionJournalBase(flourish.page.WideContainerPage,
             return None
         return score.value
 
+    def getSubmittedCells(self):
+        """Map submitted cells back to meetings and members.
+
+        Only keys of the submitted form are scanned.  Returns a list of
+        (meeting, [(person, value)]) in the order of meetings.
+        """
+        meetings = {}
+        for meeting in self.meetings:
+            meetings.setdefault(meeting.__name__, meeting)
+        if not meetings:
+            return []
+        members = dict([(person.__name__, person)
+                        for person in self.members()])
+        cells = {}
+        for cell_id, value in self.request.form.items():
+            found = splitCellId(cell_id, meetings, members)
+            if found is None:
+                continue
+            meeting, person = found
+            cells.setdefault(meeting.__name__, []).append((person, value))
+        result = []
+        for meeting in self.meetings:
+            if meeting.__name__ in cells:
+                result.append((meeting, cells.pop(meeting.__name__)))
+        return result
+
+    def updateGradebook(self):
+        return self.saveCells(self.getSubmittedCells())
+
+    def saveCells(self, submitted_cells):
+        """Save changed cells of (meeting, [(person, value)]).
+
+        Returns a list of (person, requirement, value, error) for values
+        that failed validation.
+        """
+        evaluator = getEvaluator(self.request)
+        cells = []
+        for meeting, submitted in submitted_cells:
+            requirement = self.makeRequirement(removeSecurityProxy(meeting))
+            for person, cell_value in submitted:
+                evaluations = removeSecurityProxy(IEvaluations(person))
+                score = evaluations.get(requirement)
+                if score is None or score.value is UNSCORED:
+                    current = ''
+                else:
+                    current = score.value
+                if cell_value == current:
+                    continue
+                cells.append((person, requirement, cell_value))
+        if not cells:
+            return []
+        requirement = cells[0][1]
+        return IEvaluateRequirement(requirement).evaluateMany(
+            cells, evaluator=evaluator,
+            score_system=self.getDefaultScoreSystem())
+
+    def save_scores(self, cells=None):
+        """Save a batch of changed cells.  Intended to be used from AJAX calls.
+
+        Cells are posted as a JSON list of {"id": cell id, "value": score}.
+        Nothing is saved if any of the values is not valid, or if the user
+        may not edit the section.  Returns the stored values of the cells
+        and the totals of their students.
+        """
+        result = {'cells': [],
+                  'totals': [],
+                  'errors': []}
+        response = self.request.response
+        response.setHeader('Content-Type', 'application/json')
+        encoder = flourish.tal.JSONEncoder()
+        if not checkPermission('schooltool.edit', self.context.section):
+            response.setStatus(403)
+            result['errors'].append({'id': None, 'message': 'Not allowed'})
+            return encoder.encode(result)
+        if cells is None:
+            cells = self.request.get('cells')
+        try:
+            cells = json.loads(cells or '[]')
+        except ValueError:
+            cells = None
+        if not isinstance(cells, list):
+            result['errors'].append({'id': None, 'message': 'Bad cells'})
+            cells = []
+        ss = self.getDefaultScoreSystem()
+        if ss is None:
+            cells = []
+        meetings = {}
+        for event in self.all_meetings:
+            event = removeSecurityProxy(event)
+            meetings.setdefault(event.__name__, event)
+        members = dict([(person.__name__, person)
+                        for person in self.members()])
+        submitted = {}
+        order = []
+        for cell in cells:
+            if not isinstance(cell, dict):
+                continue
+            cell_id = unicode(cell.get('id') or '')
+            value = cell.get('value')
+            if value is None:
+                value = u''
+            value = unicode(value).strip()
+            found = splitCellId(cell_id, meetings, members)
+            if found is None:
+                result['errors'].append({'id': cell_id,
+                                         'message': 'Unknown cell'})
+                continue
+            if value and not ss.isValidScore(value):
+                result['errors'].append({'id': cell_id,
+                                         'message': 'Invalid score'})
+                continue
+            meeting, person = found
+            if meeting.__name__ not in submitted:
+                order.append(meeting)
+                submitted[meeting.__name__] = []
+            submitted[meeting.__name__].append((person, value))
+        if result['errors']:
+            return encoder.encode(result)
+        submitted_cells = [(meeting, submitted[meeting.__name__])
+                           for meeting in order]
+        requirements = {}
+        for meeting in order:
+            requirements[meeting.__name__] = self.makeRequirement(meeting)
+        meeting_names = dict([(requirement, name)
+                              for name, requirement in requirements.items()])
+        for person, requirement, value, error in self.saveCells(
+            submitted_cells):
+            result['errors'].append({
+                'id': '%s_%s' % (meeting_names[requirement], person.__name__),
+                'message': unicode(error)})
+        students = []
+        for meeting, persons in submitted_cells:
+            requirement = requirements[meeting.__name__]
+            for person, value in persons:
+                evaluations = removeSecurityProxy(IEvaluations(person))
+                score = evaluations.get(requirement)
+                if score is None or score.value is UNSCORED:
+                    value = ''
+                else:
+                    value = score.value
+                result['cells'].append({
+                    'id': '%s_%s' % (meeting.__name__, person.__name__),
+                    'value': value})
+                if person not in students:
+                    students.append(person)
+        for person in students:
+            totals = {'id': person.__name__}
+            for name, value in self.studentTotals(person).items():
+                totals[name] = translate(value, context=self.request)
+            result['totals'].append(totals)
+        return encoder.encode(result)
+
+    def studentTotals(self, person):
+        """Totals of the person shown next to the grid."""
+        return {}
+
     def updateJournalMode(self):
         if self.journal_mode is None:
             return
@@ -1032,6 +1700,30 @@ class FlourishLyceumSectionJournalBase(flourish.page.WideContainerPage,
         return IRelationshipStateContainer(app)['section-membership']
 
 
+class GradebookTableContent(flourish.content.ContentProvider):
+    """Gradebook table of a section journal grid.
+
+    Rendered tables are shared between users in a process level cache,
+    grouped by journal.  Keys include stamps of the journal, tables are
+    dropped when the journal changes in this process, and tables of
+    older stamps when the journal is rendered again.  Edits of names
+    and demographics of students stamp journals of their sections too.
+    """
+
+    def render(self, *args, **kw):
+        key = self.view.getTableFragmentKey()
+        if key is None:
+            return super(GradebookTableContent, self).render(*args, **kw)
+        fragment = gradebook_fragments.get(key)
+        if fragment is None:
+            fragment = super(GradebookTableContent, self).render(*args, **kw)
+            name, stamps = key[:2]
+            gradebook_fragments.invalidate(
+                lambda cached: cached[1] != stamps, group=name)
+            gradebook_fragments.set(key, fragment, group=name)
+        return fragment
+
+
 class FlourishLyceumSectionJournalGrades(FlourishLyceumSectionJournalBase):
 
     journal_mode = 'journal-mode-grades'
@@ -1054,28 +1746,7 @@ class FlourishLyceumSectionJournalGrades(FlourishLyceumSectionJournalBase):
         return GradeRequirement.score_system
 
     def makeRequirement(self, meeting):
-        ss = self.getDefaultScoreSystem()
-        return GradeRequirement(meeting, ss)
-
-    def updateGradebook(self):
-        evaluator = getEvaluator(self.request)
-        members = self.members()
-        for meeting in self.meetings:
-            for person in members:
-                cell_id = "%s_%s" % (meeting.__name__, person.__name__)
-                cell_value = self.request.get(cell_id, None)
-                if cell_value is not None:
-                    requirement = self.makeRequirement(removeSecurityProxy(meeting))
-                    try:
-                        IEvaluateRequirement(requirement).evaluate(
-                            person, requirement, cell_value,
-                            evaluator=evaluator)
-                    except ScoreValidationError:
-                        pass
-                    except:
-                        IEvaluateRequirement(requirement).evaluate(
-                            person, requirement, cell_value,
-                            evaluator=evaluator)
+        return GradeRequirement(meeting)
 
     def table(self):
         result = []
@@ -1096,7 +1767,7 @@ class FlourishLyceumSectionJournalGrades(FlourishLyceumSectionJournalBase):
         active_students = students.on(today).any(ACTIVE)
         current_mode = getCurrentEnrollmentMode(
             IPerson(self.request.principal, None))
-        if current_mode == 'gradebook-enrollment-mode-enrolled':
+        if current_mode in (None, 'gradebook-enrollment-mode-enrolled'):
             students = active_students
         for person in students:
             css_class = ['popup_link']
@@ -1154,24 +1825,24 @@ class FlourishLyceumSectionJournalGrades(FlourishLyceumSectionJournalBase):
                     return (0, grade, row['student']['sortKey'])
         return (1, row['student']['sortKey'])
 
+    def studentTotals(self, person):
+        return {'average': self.average(person)}
+
     def average(self, person):
-        grades = []
-        scores = self.getScores(person)
-        for score in scores:
-            if score.value is UNSCORED:
-                continue
-            try:
-                grade = score.scoreSystem.getNumericalValue(score.value)
-            except KeyError:
-                continue
-            grades.append(grade)
+        totals = self.getStudentTotals(person)
+        if totals is not None:
+            total, count = totals.grades()
+            if not count:
+                return _('N/A')
+            return "%.1f" % (float(total) / float(count))
+        grades = [score.numerical for score in self.getScores(person)
+                  if score.numerical is not None]
         if not grades:
             return _('N/A')
         else:
             return "%.1f" % (float(sum(grades)) / float(len(grades)))
 
-    def getJSONScores(self, scoresystem):
-        encoder = flourish.tal.JSONEncoder()
+    def getScoreOptions(self, scoresystem):
         result = []
         for label, abbr, value, percent in scoresystem.scores:
             title = label
@@ -1181,8 +1852,7 @@ class FlourishLyceumSectionJournalGrades(FlourishLyceumSectionJournalBase):
                 'label': title,
                 'value': label,
             })
-        json = encoder.encode(result)
-        return json
+        return result
 
 
 class FlourishLyceumSectionJournalAttendance(FlourishLyceumSectionJournalBase):
@@ -1207,11 +1877,9 @@ class FlourishLyceumSectionJournalAttendance(FlourishLyceumSectionJournalBase):
         return AttendanceRequirement.score_system
 
     def makeRequirement(self, meeting):
-        ss = self.getDefaultScoreSystem()
-        return AttendanceRequirement(meeting, ss)
+        return AttendanceRequirement(meeting)
 
-    def getJSONScores(self, scoresystem):
-        encoder = flourish.tal.JSONEncoder()
+    def getScoreOptions(self, scoresystem):
         result = []
         for label, abbr in scoresystem.scores:
             title = label
@@ -1221,8 +1889,7 @@ class FlourishLyceumSectionJournalAttendance(FlourishLyceumSectionJournalBase):
                 'label': title,
                 'value': label,
             })
-        json = encoder.encode(result)
-        return json
+        return result
 
     def table(self):
         result = []
@@ -1248,7 +1915,7 @@ class FlourishLyceumSectionJournalAttendance(FlourishLyceumSectionJournalBase):
             active_students = students.on(today).any(ACTIVE)
             current_mode = getCurrentEnrollmentMode(
                 IPerson(self.request.principal, None))
-            if current_mode == 'gradebook-enrollment-mode-enrolled':
+            if current_mode in (None, 'gradebook-enrollment-mode-enrolled'):
                 students = active_students
         for person in students:
             css_class = ['popup_link']
@@ -1315,12 +1982,46 @@ class FlourishLyceumSectionJournalAttendance(FlourishLyceumSectionJournalBase):
                     return (0, grade, row['student']['sortKey'])
         return (1, row['student']['sortKey'])
 
+    @Lazy
+    def attendance_tallies(self):
+        """Attendance tallies of members in the selected term.
+
+        None if scores of this journal mode can not be tallied.
+        """
+        term = self.selected_term
+        if term is None:
+            return None
+        members = self.members()
+        journal = self.journal_data
+        if journal is not None:
+            return journal.tallyAttendance(members)
+        if self.meeting_index is None:
+            return None
+        requirements = [self.makeRequirement(removeSecurityProxy(meeting))
+                        for meeting in self.meeting_index.meetings
+                        if meeting.dtstart.date() in term]
+        return tallyAttendance(members, requirements)
+
+    def attendanceTally(self, person):
+        tallies = self.attendance_tallies
+        if tallies is None:
+            return None
+        return tallies.get(removeSecurityProxy(person).__name__)
+
+    def studentTotals(self, person):
+        excused, excusable = self.excused(person)
+        return {'absences': self.absences(person),
+                'tardies': self.tardies(person),
+                'excused': ('%s / %s' % (excused, excusable)
+                            if excusable else '')}
+
     def absences(self, person):
+        tally = self.attendanceTally(person)
+        if tally is not None:
+            return str(tally.absent)
         absences = 0
         for score in self.getScores(person):
-            if (score.value is not UNSCORED and
-                IAttendanceScoreSystem.providedBy(score.scoreSystem) and
-                score.scoreSystem.isAbsent(score)):
+            if score.absent:
                 absences += 1
         if absences == 0:
             return "0"
@@ -1328,11 +2029,12 @@ class FlourishLyceumSectionJournalAttendance(FlourishLyceumSectionJournalBase):
             return str(absences)
 
     def tardies(self, person):
+        tally = self.attendanceTally(person)
+        if tally is not None:
+            return str(tally.tardy)
         tardies = 0
         for score in self.getScores(person):
-            if (score.value is not UNSCORED and
-                IAttendanceScoreSystem.providedBy(score.scoreSystem) and
-                score.scoreSystem.isTardy(score)):
+            if score.tardy:
                 tardies += 1
         if tardies == 0:
             return "0"
@@ -1340,39 +2042,22 @@ class FlourishLyceumSectionJournalAttendance(FlourishLyceumSectionJournalBase):
             return str(tardies)
 
     def excused(self, person):
+        tally = self.attendanceTally(person)
+        if tally is not None:
+            if not tally.excusable:
+                return 0, 0
+            return tally.excused, tally.excusable
         excusable = 0
         excused = 0
         for score in self.getScores(person):
-            if (score.value is UNSCORED or
-                not IAttendanceScoreSystem.providedBy(score.scoreSystem)):
-                continue
-            ss = score.scoreSystem
-            if (ss.isAbsent(score) or
-                ss.isTardy(score) or
-                ss.isExcused(score)):
+            if score.absent or score.tardy or score.excused:
                 excusable += 1
-            if ss.isExcused(score):
+            if score.excused:
                 excused += 1
         if not excusable:
             return 0, 0
         return excused, excusable
 
-    def updateGradebook(self):
-        evaluator = getEvaluator(self.request)
-        members = self.members()
-        for meeting in self.meetings:
-            for person in members:
-                cell_id = "%s_%s" % (meeting.__name__, person.__name__)
-                cell_value = self.request.get(cell_id, None)
-                if cell_value is not None:
-                    requirement = self.makeRequirement(removeSecurityProxy(meeting))
-                    try:
-                        IEvaluateRequirement(requirement).evaluate(
-                            person, requirement, cell_value,
-                            evaluator=evaluator)
-                    except ScoreValidationError:
-                        pass
-
     def validate_score(self, activity_id=None, score=None):
         if score is None:
             score = self.request.get('score')
@@ -1407,8 +2092,7 @@ class FlourishSectionHomeroomAttendance(FlourishLyceumSectionJournalAttendance):
         return HomeroomRequirement.score_system
 
     def makeRequirement(self, meeting):
-        ss = self.getDefaultScoreSystem()
-        return HomeroomRequirement(meeting, ss)
+        return HomeroomRequirement(meeting)
 
 
 class JournalTertiaryNavigationManager(flourish.page.TertiaryNavigationManager):
@@ -1437,8 +2121,12 @@ class FlourishJournalNavigationViewletBase(flourish.viewlet.Viewlet):
     def render(self, *args, **kw):
         return self.template(*args, **kw)
 
+    @Lazy
+    def navigation(self):
+        return getInstructorNavigation(self.person)
+
     def getUserSections(self):
-        return list(IInstructor(self.person).sections())
+        return self.navigation.sections
 
     @Lazy
     def user_sections(self):
@@ -1479,25 +2167,16 @@ class FlourishJournalYearNavigationViewlet(FlourishJournalNavigationViewletBase)
     ''')
 
     def getYears(self):
-        currentSection = self.context.section
+        currentSection = removeSecurityProxy(self.context.section)
         currentYear = ISchoolYear(ITerm(currentSection))
-        years = []
-        for section in self.user_sections:
-            year = ISchoolYear(ITerm(section))
-            if year not in years:
-                years.append(year)
         return [{'title': year.title,
                  'section_url': self.getSectionURL(year),
-                 'selected': year is currentYear and 'selected' or None}
-                for year in sorted(years, key=lambda x:x.first)]
+                 'selected': (removeSecurityProxy(year) is currentYear and
+                              'selected' or None)}
+                for year in self.navigation.years]
 
     def getSectionURL(self, year):
-        result = None
-        for section in self.user_sections:
-            term = ITerm(section)
-            if ISchoolYear(term).__name__ == year.__name__:
-               result = section
-               break
+        result = self.navigation.getYearSection(year)
         url = '%s/journal' % absoluteURL(result, self.request)
         return url
 
@@ -1520,36 +2199,24 @@ class FlourishJournalTermNavigationViewlet(FlourishJournalNavigationViewletBase)
     ''')
 
     def getTerms(self):
-        currentSection = self.context.section
+        currentSection = removeSecurityProxy(self.context.section)
         currentTerm = ITerm(currentSection)
         currentYear = ISchoolYear(currentTerm)
-        terms = []
-        for section in self.user_sections:
-            term = ITerm(section)
-            if ISchoolYear(term) == currentYear and term not in terms:
-                terms.append(term)
         return [{'title': term.title,
                  'section_url': self.getSectionURL(term),
-                 'selected': term is currentTerm and 'selected' or None}
-                for term in sorted(terms, key=lambda x:x.first)]
+                 'selected': (removeSecurityProxy(term) is currentTerm and
+                              'selected' or None)}
+                for term in self.navigation.getTerms(currentYear)]
 
     def getCourse(self, section):
-        try:
-            return list(section.courses)[0]
-        except (IndexError,):
-            return None
+        return self.navigation.getCourse(section)
+
+    @Lazy
+    def current_course(self):
+        return self.getCourse(removeSecurityProxy(self.context.section))
 
     def getSectionURL(self, term):
-        result = None
-        currentSection = self.context.section
-        currentCourse = self.getCourse(currentSection)
-        for section in self.user_sections:
-            if term == ITerm(section):
-                if currentCourse == self.getCourse(section):
-                    result = section
-                    break
-                elif result is None:
-                    result = section
+        result = self.navigation.getTermSection(term, self.current_course)
         url = '%s/journal' % absoluteURL(result, self.request)
         return url
 
@@ -1573,16 +2240,14 @@ class FlourishJournalSectionNavigationViewlet(FlourishJournalNavigationViewletBa
 
     def getSections(self):
         result = []
-        currentSection = self.context.section
+        currentSection = removeSecurityProxy(self.context.section)
         currentTerm = ITerm(currentSection)
-        for section in self.user_sections:
-            term = ITerm(section)
-            if term != currentTerm:
-                continue
+        for section in self.navigation.getSections(currentTerm):
             result.append({
                 'url': '%s/journal' % absoluteURL(section, self.request),
                 'title': section.title,
-                'selected': section == currentSection and 'selected' or None,
+                'selected': (removeSecurityProxy(section) is currentSection
+                             and 'selected' or None),
                 })
         return result
 
@@ -1751,11 +2416,14 @@ class FlourishActivityPopupMenuView(flourish.content.ContentProvider):
         app = ISchoolToolApplication(None)
         tzinfo = pytz.timezone(IApplicationPreferences(app).timezone)
         activity_id = self.request.get('activity_id')
-        meetings = dict([(meeting.__name__, meeting)
-                         for meeting in self.context.meetings])
+        meeting = None
+        if activity_id is not None:
+            try:
+                meeting = self.context.findMeeting(activity_id)
+            except KeyError:
+                pass
 
-        if activity_id is not None and activity_id in meetings:
-            meeting = meetings[activity_id]
+        if meeting is not None:
             meetingDate = meeting.dtstart.astimezone(tzinfo).date()
             info = {
                 'longTitle': meetingDate.strftime("%Y-%m-%d"),
@@ -1897,6 +2565,56 @@ class FlourishRequestJournalExportAttendance(RequestXLSReportDialog):
     task_factory = JournalXLSReportTask
 
 
+class ExportRow(tuple):
+    """Plain data of a student row in journal exports."""
+    __slots__ = ()
+
+    def __new__(cls, username, first_name, last_name, student_id, values):
+        return tuple.__new__(cls, (username, first_name, last_name,
+                                   student_id, tuple(values)))
+
+    username = property(lambda self: self[0])
+    first_name = property(lambda self: self[1])
+    last_name = property(lambda self: self[2])
+    student_id = property(lambda self: self[3])
+    values = property(lambda self: self[4])
+
+
+class ThrottledProgressMixin(object):
+    """Limit progress updates of journal report tasks.
+
+    Every update may store the status of the task, so an update is
+    passed on only when progress_interval seconds passed or progress
+    moved by progress_step since the last one.  Finishing is always
+    passed on.
+    """
+
+    progress_interval = 2.0
+    progress_step = 0.05
+    progress_clock = staticmethod(time.time)
+
+    @Lazy
+    def reported_progress(self):
+        return {}
+
+    def progress(self, importer, value, *args, **kw):
+        now = self.progress_clock()
+        last = self.reported_progress.get(importer)
+        if last is not None:
+            last_time, last_value = last
+            if (now - last_time < self.progress_interval and
+                abs(value - last_value) < self.progress_step):
+                return
+        self.reported_progress[importer] = now, value
+        return super(ThrottledProgressMixin, self).progress(
+            importer, value, *args, **kw)
+
+    def finish(self, importer, *args, **kw):
+        self.reported_progress.pop(importer, None)
+        return super(ThrottledProgressMixin, self).finish(
+            importer, *args, **kw)
+
+
 class DateHeader(export.Header):
 
     @property
@@ -1906,7 +2624,8 @@ class DateHeader(export.Header):
         return result
 
 
-class FlourishJournalExportBase(export.ExcelExportView):
+class FlourishJournalExportBase(ThrottledProgressMixin,
+                                export.ExcelExportView):
 
     def print_headers(self, ws):
         row_1_headers = [export.Header(label)
@@ -1920,21 +2639,17 @@ class FlourishJournalExportBase(export.ExcelExportView):
         for col, header in enumerate(row_2_headers):
             self.write(ws, 1, col, header.data, **header.style)
 
-    def studentSortKey(self, value):
-        student = self.persons[value['student']['id']]
-        return IDemographics(student).get('ID', '')
+    def studentSortKey(self, row):
+        return (row.student_id, row.last_name, row.first_name)
 
-    def print_grades(self, ws, nmonth, total_months):
+    def print_grades(self, ws, table, columns, nmonth, total_months):
         starting_row = 2
-        table = sorted(self.table(), key=lambda x:self.studentSortKey)
         for i, row in enumerate(table):
-            student = self.persons[row['student']['id']]
-            cells = [export.Text(IDemographics(student).get('ID', '')),
-                     export.Text(student.first_name),
-                     export.Text(student.last_name)]
-            for grade in row['grades']:
-                value = grade['value']
-                cells.append(export.Text(value))
+            cells = [export.Text(row.student_id),
+                     export.Text(row.first_name),
+                     export.Text(row.last_name)]
+            for col in columns:
+                cells.append(export.Text(row.values[col]))
             for col, cell in enumerate(cells):
                 self.write(ws, starting_row+i, col, cell.data, **cell.style)
             self.progress('journal', normalized_progress(
@@ -1942,14 +2657,27 @@ class FlourishJournalExportBase(export.ExcelExportView):
                     i, len(table),
                     ))
 
+    def getMonthColumns(self):
+        """Map months to positions of their meetings in all_meetings."""
+        columns = {}
+        for n, meeting in enumerate(self.all_meetings):
+            month = self.localStart(meeting).month
+            columns.setdefault(month, []).append(n)
+        return columns
+
     def export_month_worksheets(self, wb):
         months = list(self.selected_months)
+        # Rows of the whole term are read once and sliced by month
+        table = sorted(self.iterExportRows(self.all_meetings),
+                       key=self.studentSortKey)
+        month_columns = self.getMonthColumns()
         for nm, month_id in enumerate(months):
              self._active_month = month_id
              title = self.monthTitle(month_id)
              ws = wb.add_sheet(title)
              self.print_headers(ws)
-             self.print_grades(ws, nm, len(months))
+             self.print_grades(ws, table, month_columns.get(month_id, []),
+                               nm, len(months))
              self.progress('journal', normalized_progress(
                      nm, len(months),
                      ))
@@ -1965,7 +2693,6 @@ class FlourishJournalExportBase(export.ExcelExportView):
         self.task_progress.title = _("Exporting")
         self.addImporters(self.task_progress)
         app = ISchoolToolApplication(None)
-        self.persons = app['persons']
         self.tzinfo = pytz.timezone(IApplicationPreferences(app).timezone)
         workbook = xlwt.Workbook()
         self.export_month_worksheets(workbook)
@@ -1977,33 +2704,15 @@ class FlourishJournalExportBase(export.ExcelExportView):
 
     @property
     def meetings(self):
-        result = []
-        for event in self.all_meetings:
-            insecure_event = removeSecurityProxy(event)
-            meeting_start = insecure_event.dtstart.astimezone(self.tzinfo)
-            if meeting_start.month == self.active_month:
-                result.append(event)
-        return result
+        return self.getMonthMeetings(self.active_month)
 
     @property
     def activities(self):
         result = []
         for meeting in self.meetings:
             info = {}
-            insecure_meeting = removeSecurityProxy(meeting)
-            meetingDate = insecure_meeting.dtstart.astimezone(self.tzinfo).date()
-            info['date'] = meetingDate
-            try:
-                if meeting.period is not None:
-                    short_title = meeting.period.title
-                else:
-                    short_title = ''
-                period = short_title
-                if period[-1] == ':':
-                    period = period[:-1]
-            except:
-                period = ''
-            info['period'] = period
+            info['date'] = self.localStart(meeting).date()
+            info['period'] = getPeriodTitle(meeting)
             result.append(info)
         return result
 
@@ -2035,6 +2744,12 @@ class JournalModes(flourish.page.RefineLinksViewlet):
     pass
 
 
+def takesHomeroomAttendance(section):
+    section = removeSecurityProxy(section)
+    data = removeSecurityProxy(ISectionJournalData(section))
+    return data.takes_homeroom_attendance
+
+
 def getSectionJournalModes(person, section, request):
     journal_url = absoluteURL(section, request) + '/journal'
 
@@ -2045,14 +2760,7 @@ def getSectionJournalModes(person, section, request):
             'url': journal_url,
             })
 
-    takes_day_attendance = True
-    journal = ISectionJournal(section)
-    homerooms = queryMultiAdapter(
-        (journal, request), name='homeroom.html')
-    if (homerooms is None or
-        not homerooms.all_meetings):
-        takes_day_attendance = False
-    if takes_day_attendance:
+    if takesHomeroomAttendance(section):
         result.append({
                 'id': 'journal-mode-homeroom',
                 'label': _('Homeroom'),
@@ -2081,7 +2789,7 @@ class JournalModeContent(flourish.content.ContentProvider, SectionFinder):
             return None
         section = getCurrentSectionTaught(person)
         if section is None:
-            sections = list(IInstructor(person).sections())
+            sections = getInstructorNavigation(person).sections
             if not sections:
                 return None
             schoolyears = ISchoolYearContainer(ISchoolToolApplication(None))
@@ -2193,9 +2901,8 @@ class SectionJournalGradeHistory(SubPage):
 
     @property
     def meetings(self):
-        calendar = ISchoolToolCalendar(self.context.section)
-        sorted_events = sorted(calendar, key=lambda e: e.dtstart)
-        return sorted_events
+        section = removeSecurityProxy(self.context.section)
+        return ISectionJournalData(section).getMeetingIndex().events
 
     @property
     def timezone(self):
@@ -2287,8 +2994,9 @@ class SectionJournalAttendanceHistory(SectionJournalGradeHistory):
         if (score is None or score.value is UNSCORED):
             return ''
         grade = score.value
-        if IAttendanceScoreSystem.providedBy(requirement.score_system):
-            description = dict(requirement.score_system.scores).get(grade, u'')
+        ss = self.view.getDefaultScoreSystem()
+        if IAttendanceScoreSystem.providedBy(ss):
+            description = dict(ss.scores).get(grade, u'')
         else:
             description = ''
         result = ' - '.join([translate(i, context=self.request)
@@ -2330,27 +3038,22 @@ class FlourishSchoolYearMyJournalView(flourish.page.Page):
                 continue
             yield event, grade
 
-    def getEventAttendanceScores(self, section):
+    def collectAttendance(self, name):
         person = self.person
         if person is None:
-            return
-        evaluations = removeSecurityProxy(IEvaluations(person))
-        for event in ISchoolToolCalendar(section):
-            requirement = AttendanceRequirement(removeSecurityProxy(event))
-            score = evaluations.get(requirement)
-            if not score:
-                continue
-            yield event, score
-
-    def collectAttendance(self, attr):
+            return []
+        person = removeSecurityProxy(person)
         days = {}
         for term, section in self.sections:
-            for event, score in self.getEventAttendanceScores(section):
-                if (not IAttendanceScoreSystem.providedBy(score.scoreSystem) or
-                    not getattr(score.scoreSystem, attr)(score)):
-                    continue
-                days.setdefault(event.dtstart.date(), []).append(
-                    (event.dtstart, event.period.title))
+            journal = removeSecurityProxy(
+                ISectionJournalData(removeSecurityProxy(section)))
+            index = journal.getMeetingIndex()
+            tallies = journal.tallyAttendance([person], keep_meetings=True)
+            tally = tallies[person.__name__]
+            for date, meeting_id in tally.meetings[name]:
+                for event in index.getPeriods(meeting_id):
+                    days.setdefault(event.dtstart.date(), []).append(
+                        (event.dtstart, event.period.title))
         result = []
         for day, periods in sorted(days.items()):
             result.append({
@@ -2361,12 +3064,12 @@ class FlourishSchoolYearMyJournalView(flourish.page.Page):
 
     @property
     def absences(self):
-        result = self.collectAttendance('isAbsent')
+        result = self.collectAttendance('absent')
         return result
 
     @property
     def tardies(self):
-        result = self.collectAttendance('isTardy')
+        result = self.collectAttendance('tardy')
         return result
 
     @property
@@ -2647,6 +3350,8 @@ class FlourishSchoolAttendanceGradebook(flourish.content.ContentProvider,
         table = self.view
         return table.view.month
 
+    meeting_index = None
+
     def members(self):
         return self.view.persons
 
@@ -2672,10 +3377,7 @@ class FlourishSchoolAttendanceGradebook(flourish.content.ContentProvider,
                     meetings.append(makeSchoolAttendanceMeeting(dt))
         return meetings
 
-    def getScores(self, person):
-        if person in self._grade_cache:
-            return list(self._grade_cache[person])
-        self._grade_cache[person] = result = []
+    def iterEvaluations(self, person):
         unique_meetings = set()
         terms = self.selected_terms
         events = list(self.all_meetings)
@@ -2691,9 +3393,28 @@ class FlourishSchoolAttendanceGradebook(flourish.content.ContentProvider,
                     unproxied_person, requirement, default=UNSCORED)
             if (event.meeting_id not in unique_meetings and
                 score is not UNSCORED):
-                result.append(score)
                 unique_meetings.add(event.meeting_id)
-        return result
+                yield requirement, score
+
+    def getScoreCacheKey(self, person):
+        ss = self.getDefaultScoreSystem()
+        if ss is None:
+            return None
+        app = ISchoolToolApplication(None)
+        container = app['schooltool.lyceum.journal']
+        terms = removeSecurityProxy(self.selected_terms) or ()
+        first = last = None
+        if terms:
+            first = min([term.first for term in terms])
+            last = max([term.last for term in terms])
+        return ('school-attendance',
+                tuple([(term.__name__, term._p_serial) for term in terms]),
+                self.selected_year,
+                self.selected_month,
+                person.__name__,
+                getattr(ss, '__name__', None),
+                getScoresVersion(getValidScores(ss)),
+                container.getHomeroomStamp(first, last))
 
 
 class FlourishAttendanceValidateScoreView(flourish.ajax.AJAXPart):
@@ -2701,35 +3422,40 @@ class FlourishAttendanceValidateScoreView(flourish.ajax.AJAXPart):
     def render(self):
         if not self.fromPublication:
             return ''
-        data = self.validate_score()
+        if 'scores' in self.request:
+            data = self.validate_scores()
+        else:
+            data = self.validate_score()
         json = self.setJSONResponse(data)
         return json
 
     @property
-    def requirement(self):
-        activity_id = self.request.get('activity_id')
-        if activity_id is None:
-            return None
-        dts = base64.decodestring(activity_id.strip())
-        try:
-            dt = parse(dts)
-        except ValueError:
-            return None
-        meeting = makeSchoolAttendanceMeeting(dt)
-        requirement = HomeroomRequirement(meeting)
-        return requirement
+    def score_system(self):
+        # All school attendance meetings share the homeroom score system,
+        # so there is no need to build the meeting of the activity
+        return HomeroomRequirement.score_system
 
     def validate_score(self):
         score = self.request.get('score')
         result = {'is_valid': True,
                   'is_extracredit': False}
-        requirement = self.requirement
-        if requirement is None:
+        if parseActivityId(self.request.get('activity_id')) is None:
             result['is_valid'] = False
         else:
-            result['is_valid'] = requirement.score_system.isValidScore(score)
+            result['is_valid'] = self.score_system.isValidScore(score)
         return result
 
+    def validate_scores(self):
+        try:
+            scores = json.loads(self.request.get('scores') or '[]')
+        except ValueError:
+            scores = []
+        if not isinstance(scores, list):
+            scores = []
+        ss = self.score_system
+        return {'version': getScoresVersion(getValidScores(ss)),
+                'invalid': validateScores(ss, scores)}
+
 
 class RefineFormManager(flourish.page.ContentViewletManager):
     template = flourish.templates.Inline("""
@@ -3187,7 +3913,6 @@ class EnrollmentModesSelector(flourish.viewlet.Viewlet):
         mode = getCurrentEnrollmentMode(self.person)
         if mode is None:
             mode = self.content.default_mode
-            setCurrentEnrollmentMode(self.person, mode)
         return mode
 
     def update(self):
@@ -3209,7 +3934,19 @@ class JournalDataExportRequestView(RequestXLSReportDialog):
     report_builder = 'journal_data_export.xls'
 
 
-class JournalDataExportView(export.ExcelExportView):
+class JournalDataExportXLSXRequestView(RequestXLSReportDialog):
+
+    report_builder = 'journal_data_export.xlsx'
+    task_factory = XLSXReportTask
+
+
+class JournalDataExportCSVRequestView(RequestXLSReportDialog):
+
+    report_builder = 'journal_data_export.zip'
+    task_factory = ZipReportTask
+
+
+class JournalDataExportView(ThrottledProgressMixin, export.ExcelExportView):
 
     @property
     def base_filename(self):
@@ -3219,141 +3956,170 @@ class JournalDataExportView(export.ExcelExportView):
         filename = filename.replace(' ', '_')
         return filename
 
-    def studentSortKey(self, value):
-        student = self.persons[value['student']['id']]
-        return IDemographics(student).get('ID', '')
+    def studentSortKey(self, row):
+        return (row.student_id, row.last_name, row.first_name)
 
     def addImporters(self, progress):
         self.task_progress.add('journal', title=_('Journal'), progress=0.0)
 
     def __call__(self):
+        self.setUpExport()
+        workbook = xlwt.Workbook()
+        self.export_data(workbook)
+        return workbook
+
+    def setUpExport(self):
         app = ISchoolToolApplication(None)
-        self.persons = app['persons']
         self.tzinfo = pytz.timezone(IApplicationPreferences(app).timezone)
         self.makeProgress()
         self.task_progress.title = _("Exporting")
         self.addImporters(self.task_progress)
-        workbook = xlwt.Workbook()
-        self.export_data(workbook)
-        return workbook
 
     def export_data(self, wb):
+        names = []
+        for title, rows in self.iterSheets():
+            name = sheetName(title, names)
+            names.append(name)
+            ws = wb.add_sheet(name)
+            for row_no, row in enumerate(rows):
+                for col, (value, style) in enumerate(row):
+                    cell = self.cell_factories[style](value)
+                    self.write(ws, row_no, col, cell.data, **cell.style)
+
+    cell_factories = {
+        None: export.Text,
+        'header': export.Header,
+        'date': DateHeader,
+        }
+
+    def getExportSections(self):
         sections = sorted(ISectionContainer(self.context).values(),
                           key=lambda s: s.title)
+        return [section for section in sections
+                if IScheduleContainer(section)]
+
+    def iterSheets(self):
+        """Yield (title, rows) of worksheets, section by section.
+
+        Rows are generated lazily and views of a section are dropped
+        once its worksheets are written.  Sections are exported one
+        after another: worker processes would each need a storage of
+        their own, opened from the server configuration, which this
+        package does not have.
+        """
+        sections = self.getExportSections()
         count = len(sections)
         for i, section in enumerate(sections):
-            schedules = IScheduleContainer(section)
-            if not schedules:
-                continue
-            self.add_attendance_worksheet(wb, section)
-            self.add_homeroom_worksheet(wb, section)
-            self.add_scores_worksheet(wb, section)
+            for sheet in self.iterSectionSheets(section):
+                yield sheet
             self.progress('journal', normalized_progress(i, count))
+            jar = removeSecurityProxy(section)._p_jar
+            if jar is not None:
+                jar.cacheGC()
         self.finish('journal')
 
-    def add_attendance_worksheet(self, wb, section):
+    def iterSectionSheets(self, section):
+        yield self.attendance_worksheet(section)
+        if takesHomeroomAttendance(section):
+            sheet = self.homeroom_worksheet(section)
+            if sheet is not None:
+                yield sheet
+        yield self.scores_worksheet(section)
+
+    def attendance_worksheet(self, section):
         journal = ISectionJournal(section)
         view = queryMultiAdapter(
             (journal, self.request), name='index.html')
         title = '%s-%s' % (translate(_('Attendance'), context=self.request),
                            section.__name__)
-        ws = wb.add_sheet(title[:31])
-        self.print_section_details(ws, section, _('Attendance'))
-        activities = self.getActivities(view)
-        self.print_headers(ws, activities)
-        self.print_grades(ws, view.table())
-
-    def add_homeroom_worksheet(self, wb, section):
-        takes_day_attendance = True
+        return title, self.iterRows(section, _('Attendance'), view)
+
+    def homeroom_worksheet(self, section):
         journal = ISectionJournal(section)
         view = queryMultiAdapter(
             (journal, self.request), name='homeroom.html')
-        if (view is None or
-            not view.all_meetings):
-            takes_day_attendance = False
-        if takes_day_attendance:
+        if view is not None and view.all_meetings:
             title = '%s-%s' % (translate(_('Homeroom'), context=self.request),
                                section.__name__)
-            ws = wb.add_sheet(title[:31])
-            self.print_section_details(ws, section, _('Homeroom'))
-            activities = self.getActivities(view)
-            self.print_headers(ws, activities)
-            self.print_grades(ws, view.table())
+            return title, self.iterRows(section, _('Homeroom'), view)
 
-    def add_scores_worksheet(self, wb, section):
+    def scores_worksheet(self, section):
         journal = ISectionJournal(section)
         view = queryMultiAdapter(
             (journal, self.request), name='grades.html')
         title = '%s-%s' % (translate(_('Scores'), context=self.request),
                            section.__name__)
-        ws = wb.add_sheet(title[:31])
-        self.print_section_details(ws, section, _('Scores'))
-        activities = self.getActivities(view)
-        self.print_headers(ws, activities)
-        self.print_grades(ws, view.table())
+        return title, self.iterRows(section, _('Scores'), view)
+
+    def iterRows(self, section, title, view):
+        for row in self.print_section_details(section, title):
+            yield row
+        yield []
+        for row in self.print_headers(self.getActivities(view)):
+            yield row
+        for row in self.print_grades(view.iterExportRows(view.all_meetings)):
+            yield row
 
     def getActivities(self, view):
         activities = []
         for meeting in view.all_meetings:
             info = {}
-            insecure_meeting = removeSecurityProxy(meeting)
-            meetingDate = insecure_meeting.dtstart.astimezone(self.tzinfo).date()
-            info['date'] = meetingDate
-            try:
-                if meeting.period is not None:
-                    short_title = meeting.period.title
-                else:
-                    short_title = ''
-                period = short_title
-                if period[-1] == ':':
-                    period = period[:-1]
-            except:
-                period = ''
-            info['period'] = period
+            info['date'] = view.localStart(meeting).date()
+            info['period'] = getPeriodTitle(meeting)
             activities.append(info)
         return activities
 
-    def print_section_details(self, ws, section, title):
-        starting_row = 0
-        header = export.Header(translate(_('Section'), context=self.request))
-        self.write(ws, starting_row, 0, header.data, **header.style)
-        header = export.Text(section.title)
-        self.write(ws, starting_row, 1, header.data, **header.style)
-        header = export.Header(translate(_('Term'), context=self.request))
-        self.write(ws, starting_row+1, 0, header.data, **header.style)
-        header = export.Text(ITerm(section).title)
-        self.write(ws, starting_row+1, 1, header.data, **header.style)
-        header = export.Header(translate(_('Type'), context=self.request))
-        self.write(ws, starting_row+2, 0, header.data, **header.style)
-        header = export.Text(title)
-        self.write(ws, starting_row+2, 1, header.data, **header.style)
-
-    def print_grades(self, ws, table):
-        starting_row = 6
-        table = sorted(table, key=lambda x:self.studentSortKey)
-        for i, row in enumerate(table):
-            student = self.persons[row['student']['id']]
-            cells = [export.Text(IDemographics(student).get('ID', '')),
-                     export.Text(student.first_name),
-                     export.Text(student.last_name)]
-            for grade in row['grades']:
-                value = grade['value']
-                cells.append(export.Text(value))
-            for col, cell in enumerate(cells):
-                self.write(ws, starting_row+i, col, cell.data, **cell.style)
+    def print_section_details(self, section, title):
+        return [
+            [(translate(_('Section'), context=self.request), 'header'),
+             (section.title, None)],
+            [(translate(_('Term'), context=self.request), 'header'),
+             (ITerm(section).title, None)],
+            [(translate(_('Type'), context=self.request), 'header'),
+             (title, None)],
+            ]
 
-    def print_headers(self, ws, activities):
-        starting_row = 4
-        row_1_headers = [export.Header(label)
+    def print_grades(self, rows):
+        for row in sorted(rows, key=self.studentSortKey):
+            cells = [(row.student_id, None),
+                     (row.first_name, None),
+                     (row.last_name, None)]
+            for value in row.values:
+                cells.append((value, None))
+            yield cells
+
+    def print_headers(self, activities):
+        row_1_headers = [(label, 'header')
                          for label in ['ID', 'First name', 'Last name']]
-        row_2_headers = [export.Header('') for i in range(3)]
+        row_2_headers = [('', 'header') for i in range(3)]
         for activity_info in activities:
-            row_1_headers.append(DateHeader(activity_info['date']))
-            row_2_headers.append(export.Header(activity_info['period']))
-        for col, header in enumerate(row_1_headers):
-            self.write(ws, starting_row, col, header.data, **header.style)
-        for col, header in enumerate(row_2_headers):
-            self.write(ws, starting_row+1, col, header.data, **header.style)
+            row_1_headers.append((activity_info['date'], 'date'))
+            row_2_headers.append((activity_info['period'], 'header'))
+        return [row_1_headers, row_2_headers]
+
+
+class JournalDataExportXLSXView(JournalDataExportView):
+    """Journal data export streamed to an Office Open XML workbook."""
+
+    @property
+    def filename(self):
+        return '%s.xlsx' % self.base_filename
+
+    def __call__(self):
+        self.setUpExport()
+        return XLSXWorkbook(self.iterSheets())
+
+
+class JournalDataExportCSVView(JournalDataExportView):
+    """Journal data export streamed to a zip archive of CSV files."""
+
+    @property
+    def filename(self):
+        return '%s.zip' % self.base_filename
+
+    def __call__(self):
+        self.setUpExport()
+        return CSVZipWorkbook(self.iterSheets())
 
 
 class AttendanceSummaryRequestView(RequestRemoteReportDialog):
@@ -3418,17 +4184,14 @@ class AttendanceSummaryPDFView(flourish.report.PlainPDFPage):
     @Lazy
     def scores(self):
         result = {}
-        factory = AttendanceRequirement
+        journal = removeSecurityProxy(self.context)
+        tallies = journal.tallyAttendance(self.members)
         for person in self.members:
-            result[person] = {}
-            for meeting, score in self.context.gradedMeetings(person, factory):
-                if (score is not None and
-                    score is not UNSCORED and
-                    score.value is not UNSCORED):
-                    tag = score.value.lower()
-                    if tag not in result[person]:
-                        result[person][tag] = []
-                    result[person][tag].append(1)
+            person = removeSecurityProxy(person)
+            result[person] = counts = {}
+            for value, count in tallies[person.__name__].tags.items():
+                tag = value.lower()
+                counts[tag] = counts.get(tag, 0) + count
         return result
 
     def score_column(self, tag):
@@ -3436,7 +4199,7 @@ class AttendanceSummaryPDFView(flourish.report.PlainPDFPage):
             person = removeSecurityProxy(i)
             scores = self.scores[person]
             if tag in scores:
-                return len(scores[tag])
+                return scores[tag]
         return getter
 
 
@@ -3505,10 +4268,6 @@ class AttendanceSummaryTable(table.ajax.Table):
 
     batch_size = 0
 
-    def __init__(self, *args, **kw):
-        super(AttendanceSummaryTable, self).__init__(*args, **kw)
-        self._grade_cache = {}
-
     @property
     def visible_column_names(self):
         result = ['number', 'title', 'periods']
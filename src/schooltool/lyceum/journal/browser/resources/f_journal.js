@@ -0,0 +1,137 @@
+/*
+ * Validate journal grid scores in the browser.
+ *
+ * Journal grids carry a manifest of valid scores in the data-score-manifest
+ * attribute of #gradebook.  Requests of the gradebook script to
+ * validate_score are answered from the manifest, once validate_scores has
+ * confirmed that the server still has the same version of it.  Until then,
+ * or if the versions differ, scores are validated by the server.
+ *
+ * Activity ids are not checked: the gradebook script only validates cells
+ * of the activities in the grid.
+ */
+(function($) {
+
+    var manifests = {};
+
+    function parseQuery(query) {
+        var result = {};
+        if (!query) {
+            return result;
+        }
+        var pairs = query.split('&');
+        for (var i = 0; i < pairs.length; i++) {
+            var pair = pairs[i].split('=');
+            var name = decodeURIComponent(pair[0].replace(/\+/g, ' '));
+            var value = pair.slice(1).join('=');
+            result[name] = decodeURIComponent(value.replace(/\+/g, ' '));
+        }
+        return result;
+    }
+
+    function requestData(options, originalOptions) {
+        if ($.isPlainObject(originalOptions.data)) {
+            return originalOptions.data;
+        }
+        if (typeof options.data == 'string') {
+            return parseQuery(options.data);
+        }
+        var query = options.url.split('?')[1];
+        return parseQuery(query ? query.split('#')[0] : '');
+    }
+
+    function getManifest() {
+        var text = $('#gradebook').attr('data-score-manifest');
+        if (!text) {
+            return null;
+        }
+        if (!(text in manifests)) {
+            var manifest = null;
+            try {
+                manifest = $.parseJSON(text);
+            } catch (e) {
+            }
+            if (manifest && manifest.version) {
+                var values = {};
+                for (var i = 0; i < manifest.values.length; i++) {
+                    var value = String(manifest.values[i]);
+                    if (manifest.ignoreCase) {
+                        value = value.toLowerCase();
+                    }
+                    values[value] = true;
+                }
+                manifest = {version: manifest.version,
+                            ignoreCase: manifest.ignoreCase,
+                            values: values,
+                            state: 'new'};
+            } else {
+                manifest = null;
+            }
+            manifests[text] = manifest;
+        }
+        return manifests[text];
+    }
+
+    function checkVersion(manifest, path) {
+        manifest.state = 'checking';
+        $.ajax({
+            url: path + 's',
+            type: 'POST',
+            data: {scores: '[]'},
+            dataType: 'json',
+            success: function(result) {
+                if (result && result.version == manifest.version) {
+                    manifest.state = 'current';
+                } else {
+                    manifest.state = 'stale';
+                }
+            },
+            error: function() {
+                manifest.state = 'stale';
+            }
+        });
+    }
+
+    function isValid(manifest, score) {
+        if (!$.trim(score)) {
+            return true;
+        }
+        if (manifest.ignoreCase) {
+            score = score.toLowerCase();
+        }
+        return manifest.values.hasOwnProperty(score);
+    }
+
+    $.ajaxTransport('+*', function(options, originalOptions, jqXHR) {
+        var path = options.url.split(/[?#]/)[0];
+        if (!/\/validate_score$/.test(path)) {
+            return;
+        }
+        var manifest = getManifest();
+        if (!manifest) {
+            return;
+        }
+        if (manifest.state == 'new') {
+            checkVersion(manifest, path);
+        }
+        if (manifest.state != 'current') {
+            return;
+        }
+        var data = requestData(options, originalOptions);
+        if (data.score === undefined || data.score === null) {
+            return;
+        }
+        return {
+            send: function(headers, complete) {
+                var valid = isValid(manifest, String(data.score));
+                var text = ('{"is_valid": ' + valid +
+                            ', "is_extracredit": false}');
+                complete(200, 'success', {text: text},
+                         'Content-Type: application/json\r\n');
+            },
+            abort: function() {
+            }
+        };
+    });
+
+})(jQuery);
@@ -573,6 +573,283 @@ def doctest_SectionListView():
     """
 
 
+def doctest_validateScores():
+    """Tests for validateScores and the score manifest version
+
+        >>> from schooltool.lyceum.journal.browser.journal import getValidScores
+        >>> from schooltool.lyceum.journal.browser.journal import getScoresVersion
+        >>> from schooltool.lyceum.journal.browser.journal import validateScores
+        >>> from schooltool.lyceum.journal.journal import AttendanceScoreSystem
+
+        >>> ss = AttendanceScoreSystem('Attendance')
+        >>> getValidScores(ss)
+        ['a', 'ae', 't', 'te']
+
+        >>> validateScores(ss, ['A', 'te', '', ' ', 'x', 5])
+        ['x', 5]
+
+    The version of valid scores changes with the scores:
+
+        >>> version = getScoresVersion(getValidScores(ss))
+        >>> len(version)
+        8
+        >>> getScoresVersion(['a', 'ae', 't', 'te']) == version
+        True
+        >>> getScoresVersion(['a', 'ae', 't']) == version
+        False
+
+    """
+
+
+def doctest_parseActivityId():
+    """Tests for parseActivityId
+
+        >>> import base64
+        >>> from schooltool.lyceum.journal.browser.journal import \\
+        ...     parseActivityId
+
+        >>> activity_id = base64.encodestring('2014-01-30 09:00:00+00:00')
+        >>> parseActivityId(activity_id)
+        datetime.datetime(2014, 1, 30, 9, 0, tzinfo=tzutc())
+
+    Missing and malformed ids are not valid:
+
+        >>> print parseActivityId(None)
+        None
+        >>> print parseActivityId('')
+        None
+        >>> print parseActivityId('abc')
+        None
+        >>> print parseActivityId(base64.encodestring('garbage'))
+        None
+        >>> print parseActivityId(u'\\u0105')
+        None
+
+    """
+
+
+def doctest_splitCellId():
+    """Tests for splitCellId
+
+        >>> from schooltool.lyceum.journal.browser.journal import splitCellId
+
+        >>> meetings = {'2011-05-05T10:00:00+00:00': 'meeting',
+        ...             'meeting_2': 'meeting 2'}
+        >>> members = {'john': 'John', 'jane_doe': 'Jane'}
+
+        >>> splitCellId('2011-05-05T10:00:00+00:00_john', meetings, members)
+        ('meeting', 'John')
+
+    Both meeting names and usernames may contain underscores:
+
+        >>> splitCellId('meeting_2_jane_doe', meetings, members)
+        ('meeting 2', 'Jane')
+
+    Other form keys are not cells:
+
+        >>> print splitCellId('UPDATE_SUBMIT', meetings, members)
+        None
+        >>> print splitCellId('meeting_2_pete', meetings, members)
+        None
+
+    """
+
+
+def doctest_FlourishLyceumSectionJournalBase_save_scores_not_allowed():
+    """Tests for FlourishLyceumSectionJournalBase.save_scores
+
+    Users that may not edit the section get an error and nothing is saved:
+
+        >>> from zope.security.management import newInteraction
+        >>> from zope.security.management import endInteraction
+        >>> from schooltool.lyceum.journal.browser.journal import \\
+        ...     FlourishLyceumSectionJournalBase
+
+        >>> class JournalStub(object):
+        ...     section = object()
+        >>> class ParticipationStub(object):
+        ...     principal = 'teacher'
+        ...     interaction = None
+
+        >>> view = FlourishLyceumSectionJournalBase.__new__(
+        ...     FlourishLyceumSectionJournalBase)
+        >>> view.context = JournalStub()
+        >>> view.request = TestRequest()
+        >>> view.saveCells = lambda cells: 1/0
+
+        >>> newInteraction(ParticipationStub())
+        >>> import json
+        >>> result = json.loads(
+        ...     view.save_scores('[{"id": "meeting_john", "value": "5"}]'))
+        >>> result['cells'], result['totals']
+        ([], [])
+        >>> [(error['id'], error['message']) for error in result['errors']]
+        [(None, u'Not allowed')]
+        >>> view.request.response.getStatus()
+        403
+        >>> view.request.response.getHeader('Content-Type')
+        'application/json'
+        >>> endInteraction()
+
+    """
+
+
+def doctest_ExportRow():
+    """Tests for ExportRow
+
+        >>> from schooltool.lyceum.journal.browser.journal import ExportRow
+        >>> row = ExportRow('john', u'John', u'Doe', '007', ['5', '', 'n'])
+        >>> row.username, row.first_name, row.last_name, row.student_id
+        ('john', u'John', u'Doe', '007')
+        >>> row.values
+        ('5', '', 'n')
+
+    Rows are plain data:
+
+        >>> row == ('john', u'John', u'Doe', '007', ('5', '', 'n'))
+        True
+
+    """
+
+
+def doctest_ThrottledProgressMixin():
+    """Tests for ThrottledProgressMixin
+
+        >>> from schooltool.lyceum.journal.browser.journal import \\
+        ...     ThrottledProgressMixin
+
+        >>> class ExportStub(object):
+        ...     def progress(self, importer, value):
+        ...         print 'progress', importer, value
+        ...     def finish(self, importer):
+        ...         print 'finish', importer
+
+        >>> class ExportView(ThrottledProgressMixin, ExportStub):
+        ...     now = 0.0
+        ...     def progress_clock(self):
+        ...         return self.now
+
+        >>> view = ExportView()
+        >>> view.progress('journal', 0.0)
+        progress journal 0.0
+
+    Small steps in a short time are not reported:
+
+        >>> view.progress('journal', 0.01)
+        >>> view.now = 1.0
+        >>> view.progress('journal', 0.02)
+
+    Large enough steps are:
+
+        >>> view.progress('journal', 0.06)
+        progress journal 0.06
+
+    And so are small steps after a while:
+
+        >>> view.now = 3.5
+        >>> view.progress('journal', 0.07)
+        progress journal 0.07
+
+        >>> view.finish('journal')
+        finish journal
+        >>> view.progress('journal', 0.0)
+        progress journal 0.0
+
+    """
+
+
+def doctest_FlourishJournalExportBase_export_month_worksheets():
+    """Tests for FlourishJournalExportBase.export_month_worksheets
+
+        >>> from schooltool.lyceum.journal.browser.journal import \\
+        ...     FlourishJournalExportBase, FlourishLyceumSectionJournalBase
+        >>> from schooltool.lyceum.journal.browser.journal import ExportRow
+
+    The term has two meetings in January and one in February:
+
+        >>> class PeriodStub(object):
+        ...     def __init__(self, title):
+        ...         self.title = title
+
+        >>> class MeetingStub(object):
+        ...     def __init__(self, name, dtstart, period):
+        ...         self.__name__ = name
+        ...         self.dtstart = dtstart
+        ...         self.period = PeriodStub(period)
+
+        >>> meetings = [
+        ...     MeetingStub('m1', datetime(2014, 1, 30, 9, tzinfo=utc), 'A:'),
+        ...     MeetingStub('m2', datetime(2014, 1, 31, 10, tzinfo=utc), 'B:'),
+        ...     MeetingStub('m3', datetime(2014, 2, 3, 9, tzinfo=utc), 'C:')]
+
+        >>> base = FlourishLyceumSectionJournalBase
+        >>> class ExportStub(FlourishJournalExportBase):
+        ...     all_meetings = meetings
+        ...     selected_months = [1, 2]
+        ...     month_index = base.month_index
+        ...     term_months = base.term_months
+        ...     getMonthMeetings = base.getMonthMeetings.im_func
+        ...     def localStart(self, meeting):
+        ...         return meeting.dtstart
+        ...     def monthTitle(self, month):
+        ...         return {1: 'January', 2: 'February'}[month]
+        ...     def iterExportRows(self, meetings):
+        ...         print 'reading', [meeting.__name__ for meeting in meetings]
+        ...         yield ExportRow('jane', 'Jane', 'Doe', '2', ['n', '', 'a'])
+        ...         yield ExportRow('john', 'John', 'Doe', '1', ['', 'a', 't'])
+        ...     def write(self, ws, row, col, data, **style):
+        ...         ws.cells[row, col] = data
+        ...     def progress(self, importer, value, *args):
+        ...         pass
+        ...     def finish(self, importer):
+        ...         pass
+
+        >>> class SheetStub(object):
+        ...     def __init__(self, title):
+        ...         self.title = title
+        ...         self.cells = {}
+        ...     def show(self):
+        ...         print self.title
+        ...         rows = max([row for row, col in self.cells]) + 1
+        ...         cols = max([col for row, col in self.cells]) + 1
+        ...         for row in range(rows):
+        ...             print [self.cells.get((row, col)) for col in range(cols)]
+
+        >>> class WorkbookStub(object):
+        ...     def __init__(self):
+        ...         self.sheets = []
+        ...     def add_sheet(self, title):
+        ...         self.sheets.append(SheetStub(title))
+        ...         return self.sheets[-1]
+
+        >>> view = ExportStub(None, TestRequest())
+        >>> view.getMonthColumns()
+        {1: [0, 1], 2: [2]}
+
+    Rows of the whole term are read once and sliced into month sheets,
+    each column under the header of its meeting:
+
+        >>> wb = WorkbookStub()
+        >>> view.export_month_worksheets(wb)
+        reading ['m1', 'm2', 'm3']
+
+        >>> for ws in wb.sheets:
+        ...     ws.show()
+        January
+        ['ID', 'First name', 'Last name',
+         datetime.date(2014, 1, 30), datetime.date(2014, 1, 31)]
+        ['', '', '', 'A', 'B']
+        ['1', 'John', 'Doe', '', 'a']
+        ['2', 'Jane', 'Doe', 'n', '']
+        February
+        ['ID', 'First name', 'Last name', datetime.date(2014, 2, 3)]
+        ['', '', '', 'C']
+        ['1', 'John', 'Doe', 't']
+        ['2', 'Jane', 'Doe', 'a']
+
+    """
+
+
 def setUp(test):
     setup.placelessSetUp()
     setup.setUpTraversal()
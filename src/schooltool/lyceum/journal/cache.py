@@ -0,0 +1,128 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2014 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Process level caches of the journal.
+"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """A thread safe cache with a budget for the total size of values.
+
+    Least recently used values are evicted when the budget is exceeded.
+    Keys should include stamps of everything the value depends on, so
+    that stale values are never found.  Values can be set in a group,
+    so that values of a group are dropped without scanning all keys.
+    """
+
+    def __init__(self, budget, sizeof=len):
+        self.budget = budget
+        self.sizeof = sizeof
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+        self.groups = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                entry = self.data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.data[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def _drop(self, key):
+        size, value, group = self.data.pop(key)
+        self.size -= size
+        if group is not None:
+            keys = self.groups[group]
+            keys.discard(key)
+            if not keys:
+                del self.groups[group]
+
+    def set(self, key, value, group=None):
+        size = self.sizeof(value)
+        with self.lock:
+            if key in self.data:
+                self._drop(key)
+            if size > self.budget:
+                return
+            self.data[key] = size, value, group
+            self.size += size
+            if group is not None:
+                self.groups.setdefault(group, set()).add(key)
+            while self.size > self.budget:
+                self._drop(next(iter(self.data)))
+                self.evictions += 1
+
+    def invalidate(self, match=None, group=None):
+        """Drop values of the keys matched by match(key).
+
+        Only keys of the group are matched if a group is given, all of
+        them if match is None.
+        """
+        with self.lock:
+            if group is None:
+                keys = list(self.data)
+            else:
+                keys = list(self.groups.get(group, ()))
+            for key in keys:
+                if match is None or match(key):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.groups.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            hit_rate = lookups and float(self.hits) / lookups or 0.0
+            return {'entries': len(self.data),
+                    'size': self.size,
+                    'budget': self.budget,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_rate': hit_rate,
+                    'evictions': self.evictions,
+                    'invalidations': self.invalidations}
+
+
+# Scored meetings of students, the budget is in meetings
+SCORE_CACHE_BUDGET = 500000
+scored_meetings = LRUCache(SCORE_CACHE_BUDGET,
+                           sizeof=lambda meetings: len(meetings) + 1)
+
+# Rendered gradebook tables grouped by journal name, the budget is in
+# characters
+GRADEBOOK_FRAGMENT_BUDGET = 16 * 1024 * 1024
+gradebook_fragments = LRUCache(GRADEBOOK_FRAGMENT_BUDGET)
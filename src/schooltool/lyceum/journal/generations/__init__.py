@@ -24,5 +24,5 @@ from zope.app.generations.generations import SchemaManager
 
 schemaManager = SchemaManager(
     minimum_generation=4,
-    generation=4,
+    generation=6,
     package_name='schooltool.lyceum.journal.generations')
@@ -0,0 +1,53 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2013 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Evolve database to generation 5.
+
+Build score indexes and student totals of section journals.
+"""
+from zope.app.generations.utility import findObjectsProviding
+from zope.app.publication.zopepublication import ZopePublication
+from zope.component.hooks import getSite, setSite
+from zope.component import getUtility
+from zope.intid.interfaces import IIntIds
+
+from schooltool.app.interfaces import ISchoolToolApplication
+
+
+def evolveJournals(app):
+    container = app['schooltool.lyceum.journal']
+    int_ids = getUtility(IIntIds)
+
+    for section_id, journal in container.items():
+        section = int_ids.queryObject(int(section_id))
+        if section is None:
+            continue
+        journal.rebuildIndex()
+
+
+def evolve(context):
+    root = context.connection.root().get(ZopePublication.root_name, None)
+    old_site = getSite()
+
+    apps = findObjectsProviding(root, ISchoolToolApplication)
+    for app in apps:
+        setSite(app)
+        if 'schooltool.lyceum.journal' in app:
+            evolveJournals(app)
+
+    setSite(old_site)
@@ -0,0 +1,80 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2014 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Evolve database to generation 6.
+
+Convert keys of meeting evaluations to compact requirements.
+"""
+from zope.app.generations.utility import findObjectsProviding
+from zope.app.publication.zopepublication import ZopePublication
+from zope.component.hooks import getSite, setSite
+from zope.security.proxy import removeSecurityProxy
+
+from schooltool.app.interfaces import ISchoolToolApplication
+from schooltool.requirement.interfaces import IEvaluations
+
+from schooltool.lyceum.journal.journal import MeetingRequirement
+
+
+def compactEvaluation(evaluation):
+    requirement = getattr(evaluation, 'requirement', None)
+    if (isinstance(requirement, MeetingRequirement) and
+        not requirement.isCompact()):
+        evaluation.requirement = requirement.compact()
+
+
+def compactKeys(btree):
+    legacy = [key for key in btree.keys()
+              if (isinstance(key, MeetingRequirement) and
+                  not key.isCompact())]
+    for key in legacy:
+        value = btree[key]
+        del btree[key]
+        btree[key.compact()] = value
+    return bool(legacy)
+
+
+def evolveEvaluations(evaluations):
+    btree = getattr(evaluations, '_btree', None)
+    if btree is not None and compactKeys(btree):
+        for evaluation in btree.values():
+            compactEvaluation(evaluation)
+    history = getattr(evaluations, '_history', None)
+    if history is not None and compactKeys(history):
+        for evaluation_list in history.values():
+            for evaluation in evaluation_list:
+                compactEvaluation(evaluation)
+
+
+def evolvePersons(app):
+    for person in app['persons'].values():
+        evaluations = removeSecurityProxy(IEvaluations(person, None))
+        if evaluations is not None:
+            evolveEvaluations(evaluations)
+
+
+def evolve(context):
+    root = context.connection.root().get(ZopePublication.root_name, None)
+    old_site = getSite()
+
+    apps = findObjectsProviding(root, ISchoolToolApplication)
+    for app in apps:
+        setSite(app)
+        evolvePersons(app)
+
+    setSite(old_site)
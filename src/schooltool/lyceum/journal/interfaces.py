@@ -33,6 +33,14 @@ class IEvaluateRequirement(Interface):
     def evaluate(person, requirement, grade, evaluator=None, score_system=None):
         """Add evaluation of a requirement."""
 
+    def evaluateMany(evaluations, evaluator=None, score_system=None):
+        """Add evaluations of many requirements at once.
+
+        evaluations is a sequence of (person, requirement, grade).
+        Returns a list of (person, requirement, grade, error) for grades
+        that failed validation.
+        """
+
     def getEvaluation(person, requirement, default=None):
         """Get evaluation of a requirement."""
 
@@ -42,6 +50,18 @@ class ISectionJournalData(IEvaluateRequirement):
 
     section = Attribute("""Section this data belongs to.""")
 
+    takes_homeroom_attendance = Attribute(
+        """True if the section is scheduled for homeroom periods.""")
+
+    change_stamp = Attribute(
+        """Bumped by evaluations, membership and schedule changes.""")
+
+    changed_on = Attribute(
+        """Time of the last change, in seconds since the epoch, or None.""")
+
+    def journalChanged():
+        """Bump the change stamp of the journal."""
+
     def setGrade(person, meeting, grade):
         """Set a grade for a person participating in this meeting."""
 
@@ -66,6 +86,48 @@ class ISectionJournalData(IEvaluateRequirement):
     def absentMeetings(person):
         """Returns a list of (meeting, absence) for a person."""
 
+    def iterScores(requirement_type, first=None, last=None):
+        """Iterate over indexed evaluations of a requirement type.
+
+        Yields (date, meeting_id, scores) ordered by date, where scores
+        maps person usernames to evaluations.  Dates are inclusive.
+        """
+
+    def getScores(requirement_type, first=None, last=None):
+        """Return a dict of {(date, meeting_id): {username: evaluation}}.
+
+        Returns None if the journal has no score index.
+        """
+
+    def getStudentTotals(person):
+        """Return running score totals of a person in this journal.
+
+        Only scores of meetings in the section calendar are counted.
+        Returns None if the journal does not keep totals.
+        """
+
+    def tallyAttendance(persons, first=None, last=None, keep_meetings=False):
+        """Count attendance scores of persons in one pass.
+
+        Only scores of meetings in the section calendar are counted.
+        Dates are inclusive.  Returns a dict of {username: tally}, where
+        a tally has tags ({score value: count}), absent, tardy, excused
+        and excusable counts.  If keep_meetings is set, tally.meetings
+        lists (date, meeting_id) of absent, tardy and excused scores.
+        """
+
+    def rebuildIndex():
+        """Rebuild the score index and totals from evaluations.
+
+        Evaluations of members and of persons in the old index are read.
+        """
+
+    def getMeetingIndex(timezone=None):
+        """Return the date sorted meeting index of the section.
+
+        The index is cached until schedules of the section change.
+        """
+
 
 class ISectionJournal(ILocation):
 
@@ -109,6 +171,15 @@ class ISectionJournal(ILocation):
         goes through all their calendars to find the meeting.
         """
 
+    def getStudentTotals(person):
+        """Return running score totals of a person in this section."""
+
+    def tallyAttendance(persons, first=None, last=None, keep_meetings=False):
+        """Count attendance scores of persons in this section.
+
+        See ISectionJournalData.tallyAttendance.
+        """
+
 
 class IAttendanceScoreSystem(IScoreSystem):
 
@@ -18,14 +18,21 @@
 """
 Lyceum journal content classes.
 """
+import time
+import weakref
+import datetime
+import pytz
 from decimal import Decimal
 from persistent import Persistent
+from BTrees.Length import Length
+from BTrees.OOBTree import OOBTree
 
 import zope.schema
 import zope.schema.interfaces
 import zope.schema.vocabulary
 import z3c.form.widget
 from zope.annotation.interfaces import IAnnotations
+from zope.security.checker import ProxyFactory
 from zope.security.proxy import removeSecurityProxy
 from zope.intid.interfaces import IIntIds
 from zope.container.btree import BTreeContainer
@@ -40,15 +47,24 @@ from zope.interface import implements
 from zope.interface import Interface
 from zope.keyreference.interfaces import IKeyReference
 from zope.location.interfaces import ILocation
+from zope.lifecycleevent.interfaces import IObjectModifiedEvent
+from zope.lifecycleevent.interfaces import IObjectMovedEvent
+from zope.lifecycleevent.interfaces import IObjectRemovedEvent
 
 from schooltool.app.app import InitBase, StartUpBase
+from schooltool.app.interfaces import IApplicationPreferences
 from schooltool.app.interfaces import ISchoolToolApplication
 from schooltool.app.interfaces import ISchoolToolCalendar
+from schooltool.app.membership import URIMembership, URIGroup
+from schooltool.app.relationships import URIInstruction
+from schooltool.basicperson.interfaces import IDemographics
 from schooltool.course.interfaces import ILearner
 from schooltool.course.interfaces import IInstructor
 from schooltool.course.interfaces import ISection
 from schooltool.export.export import XLSReportTask
 from schooltool.person.interfaces import IPerson
+from schooltool.relationship.interfaces import IRelationshipAddedEvent
+from schooltool.relationship.interfaces import IRelationshipRemovedEvent
 from schooltool.report.report import ReportTask
 from schooltool.requirement.interfaces import ICustomScoreSystem
 from schooltool.requirement.interfaces import IEvaluations
@@ -61,6 +77,12 @@ from schooltool.requirement.scoresystem import ScoreValidationError, UNSCORED
 from schooltool.requirement.interfaces import IScoreSystemContainer
 from schooltool.securitypolicy.crowds import ConfigurableCrowd
 from schooltool.securitypolicy.crowds import ClerksCrowd
+from schooltool.schoolyear.interfaces import ISchoolYear
+from schooltool.term.interfaces import IDateManager
+from schooltool.term.interfaces import ITerm
+from schooltool.timetable.interfaces import IHaveSchedule
+from schooltool.timetable.interfaces import ISchedule
+from schooltool.timetable.interfaces import IPeriod
 
 from schooltool.lyceum.journal.interfaces import IJournalScoreSystemPreferences
 from schooltool.lyceum.journal.interfaces import IAttendanceScoreSystem
@@ -69,6 +91,7 @@ from schooltool.lyceum.journal.interfaces import IEvaluateRequirement
 from schooltool.lyceum.journal.interfaces import ISectionJournal
 from schooltool.lyceum.journal.interfaces import ISectionJournalData
 from schooltool.lyceum.journal.interfaces import IAvailableScoreSystems
+from schooltool.lyceum.journal.cache import gradebook_fragments
 from schooltool.lyceum.journal import LyceumMessage as _
 
 # BBB
@@ -78,6 +101,27 @@ TARDY = 'p' #p means tardy in lithuanian
 CURRENT_SECTION_TAUGHT_KEY = 'schooltool.gradebook.currentsectiontaught'
 CURRENT_JOURNAL_MODE_KEY = 'schooltool.gradebook.currentjournalmode'
 CURRENT_ENROLLMENT_MODE_KEY = 'schooltool.gradebook.currentenrollmentmode'
+USER_PREFERENCES_KEY = 'schooltool.lyceum.journal-user-prefs'
+
+
+class AttendanceScoreLookup(object):
+    """Lookup tables of an attendance score system."""
+
+    def __init__(self, scores, tag_absent, tag_tardy, tag_excused):
+        self.sources = (scores, tag_absent, tag_tardy, tag_excused)
+        self.scores = dict(scores)
+        self.folded = {}
+        for score, label in scores:
+            self.folded.setdefault(score.lower(), score)
+        self.absent = frozenset(tag_absent)
+        self.tardy = frozenset(tag_tardy)
+        self.excused = frozenset(tag_excused)
+
+    def isCompiledFrom(self, *sources):
+        for source, compiled in zip(sources, self.sources):
+            if source is not compiled:
+                return False
+        return True
 
 
 class AttendanceScoreSystem(AbstractScoreSystem):
@@ -106,44 +150,51 @@ class AttendanceScoreSystem(AbstractScoreSystem):
             for attr in ('tag_absent', 'tag_tardy', 'tag_excused'):
                 setattr(self, attr, tuple(kw.get(attr, ())))
 
+    @property
+    def lookup(self):
+        """Lookup tables, compiled again when scores or tags are set."""
+        sources = (self.scores, self.tag_absent,
+                   self.tag_tardy, self.tag_excused)
+        lookup = getattr(self, '_v_lookup', None)
+        if lookup is None or not lookup.isCompiledFrom(*sources):
+            lookup = self._v_lookup = AttendanceScoreLookup(*sources)
+        return lookup
+
     def isValidScore(self, score):
         """See interfaces.IScoreSystem"""
         if score is UNSCORED:
             return True
         if not isinstance(score, (str, unicode)):
             return False
-        for s in self.scoresDict.keys():
-            if s.lower() == score.lower():
-                return True
-        return False
+        return score.lower() in self.lookup.folded
 
     def fromUnicode(self, rawScore):
         """See interfaces.IScoreSystem"""
         if not rawScore:
             return UNSCORED
-        for score in self.scoresDict.keys():
-            if score.lower() == rawScore.lower():
-                return score
-        raise ScoreValidationError(rawScore)
+        score = self.lookup.folded.get(rawScore.lower())
+        if score is None:
+            raise ScoreValidationError(rawScore)
+        return score
 
     def isTardy(self, score):
         if not score:
             return False
-        return score.value in self.tag_tardy
+        return score.value in self.lookup.tardy
 
     def isAbsent(self, score):
         if not score:
             return False
-        return score.value in self.tag_absent
+        return score.value in self.lookup.absent
 
     def isExcused(self, score):
         if not score:
             return False
-        return score.value in self.tag_excused
+        return score.value in self.lookup.excused
 
-    @Lazy
+    @property
     def scoresDict(self):
-        return dict(self.scores)
+        return self.lookup.scores
 
 
 class PersistentAttendanceScoreSystem(AttendanceScoreSystem, Persistent):
@@ -166,6 +217,39 @@ class GlobalJournalRangedValuesScoreSystem(GlobalRangedValuesScoreSystem):
     pass
 
 
+_NOT_NUMERICAL = object()
+
+
+def getNumericalValue(score_system, value):
+    """Return the numerical value of a score.
+
+    Values of score systems with a list of scores are looked up in a
+    table that is built again when the scores are set.  Raises KeyError
+    for values the score system does not know.
+    """
+    scores = getattr(score_system, 'scores', None)
+    if scores is None:
+        return score_system.getNumericalValue(value)
+    cached = getattr(score_system, '_v_lyceum_numerical', None)
+    if cached is None or cached[0] is not scores:
+        cached = scores, {}
+        try:
+            score_system._v_lyceum_numerical = cached
+        except AttributeError:
+            pass
+    table = cached[1]
+    numerical = table.get(value)
+    if numerical is None:
+        try:
+            numerical = score_system.getNumericalValue(value)
+        except KeyError:
+            numerical = _NOT_NUMERICAL
+        table[value] = numerical
+    if numerical is _NOT_NUMERICAL:
+        raise KeyError(value)
+    return numerical
+
+
 # The score system used in the old journal
 TenPointScoreSystem = GlobalJournalRangedValuesScoreSystem(
     'TenPointScoreSystem',
@@ -194,54 +278,328 @@ def getInstructorSections(person):
     return list(IInstructor(person).sections())
 
 
+class UserJournalPreferences(Persistent):
+    """Journal navigation state of a user."""
+
+    section = None
+    journal_mode = None
+    enrollment_mode = None
+
+
+class JournalUserPreferencesStore(Persistent):
+    """Journal navigation state of all users, by username.
+
+    Kept apart from person objects and their annotations, so that
+    journal navigation does not modify persons.
+    """
+
+    def __init__(self):
+        self.users = OOBTree()
+
+    def get(self, username):
+        return self.users.get(username)
+
+    def getOrCreate(self, username):
+        prefs = self.users.get(username)
+        if prefs is None:
+            prefs = self.users[username] = UserJournalPreferences()
+        return prefs
+
+
+BBB_PREFERENCE_KEYS = {
+    'section': CURRENT_SECTION_TAUGHT_KEY,
+    'journal_mode': CURRENT_JOURNAL_MODE_KEY,
+    'enrollment_mode': CURRENT_ENROLLMENT_MODE_KEY,
+    }
+
+
+def getUserPreference(person, name):
+    if person is None:
+        return None
+    person = removeSecurityProxy(person)
+    app = ISchoolToolApplication(None)
+    store = app.get(USER_PREFERENCES_KEY)
+    prefs = None
+    if store is not None:
+        prefs = store.get(person.__name__)
+    if prefs is not None:
+        return getattr(prefs, name)
+    # BBB: navigation state used to be stored in person annotations
+    ann = IAnnotations(person)
+    return ann.get(BBB_PREFERENCE_KEYS[name], None)
+
+
+def setUserPreference(person, name, value):
+    person = removeSecurityProxy(person)
+    app = ISchoolToolApplication(None)
+    store = app[USER_PREFERENCES_KEY]
+    prefs = store.get(person.__name__)
+    if prefs is None:
+        prefs = store.getOrCreate(person.__name__)
+        ann = IAnnotations(person)
+        for attr, key in BBB_PREFERENCE_KEYS.items():
+            setattr(prefs, attr, ann.get(key, None))
+    if getattr(prefs, name) != value:
+        setattr(prefs, name, value)
+
+
 def getCurrentSectionTaught(person):
-    ann = IAnnotations(removeSecurityProxy(person))
-    if CURRENT_SECTION_TAUGHT_KEY not in ann:
-        ann[CURRENT_SECTION_TAUGHT_KEY] = None
-    else:
-        section = ann[CURRENT_SECTION_TAUGHT_KEY]
-        if section not in getInstructorSections(person):
-            return None
-        try:
-            getSectionJournalData(section)
-        except:
-            ann[CURRENT_SECTION_TAUGHT_KEY] = None
-    return ann[CURRENT_SECTION_TAUGHT_KEY]
+    section = getUserPreference(person, 'section')
+    if section is None:
+        return None
+    if section not in getInstructorSections(person):
+        return None
+    int_ids = getUtility(IIntIds)
+    if int_ids.queryId(section) is None:
+        return None
+    return section
 
 
 def setCurrentSectionTaught(person, section):
-    ann = IAnnotations(removeSecurityProxy(person))
+    section = removeSecurityProxy(section)
+    current = getUserPreference(person, 'section')
+    if current is section:
+        return
     if section in getInstructorSections(person):
-        ann[CURRENT_SECTION_TAUGHT_KEY] = removeSecurityProxy(section)
+        setUserPreference(person, 'section', section)
 
 
 def getCurrentJournalMode(person):
-    ann = IAnnotations(removeSecurityProxy(person))
-    if CURRENT_JOURNAL_MODE_KEY not in ann:
-        ann[CURRENT_JOURNAL_MODE_KEY] = None
-    return ann.get(CURRENT_JOURNAL_MODE_KEY, None)
+    return getUserPreference(person, 'journal_mode')
 
 
 def setCurrentJournalMode(person, mode):
-    ann = IAnnotations(removeSecurityProxy(person))
-    ann[CURRENT_JOURNAL_MODE_KEY] = mode
+    setUserPreference(person, 'journal_mode', mode)
 
 
 def getCurrentEnrollmentMode(person):
-    ann = IAnnotations(removeSecurityProxy(person))
-    if CURRENT_ENROLLMENT_MODE_KEY not in ann:
-        ann[CURRENT_ENROLLMENT_MODE_KEY] = None
-    return ann.get(CURRENT_ENROLLMENT_MODE_KEY, None)
+    return getUserPreference(person, 'enrollment_mode')
 
 
 def setCurrentEnrollmentMode(person, mode):
-    ann = IAnnotations(removeSecurityProxy(person))
-    ann[CURRENT_ENROLLMENT_MODE_KEY] = mode
+    setUserPreference(person, 'enrollment_mode', mode)
 
 
 class LyceumJournalContainer(BTreeContainer):
     """A container for all the journals in the system."""
 
+    # Bumped when activity types of timetable periods change
+    activity_stamp = 0
+    # Bumped when instructors are added to or removed from sections
+    instruction_stamp = 0
+    # Counts changes of homeroom evaluations by (year, month) of their
+    # date, Length objects resolve conflicting increments
+    homeroom_changes = None
+
+    def getHomeroomStamp(self, first=None, last=None):
+        """Counts of homeroom changes in months of dates first to last."""
+        if self.homeroom_changes is None:
+            return ()
+        min_key = max_key = None
+        if first is not None:
+            min_key = (first.year, first.month)
+        if last is not None:
+            max_key = (last.year, last.month)
+        return tuple([(key, changes())
+                      for key, changes in self.homeroom_changes.items(
+                          min=min_key, max=max_key)])
+
+    def homeroomChanged(self, date):
+        if self.homeroom_changes is None:
+            self.homeroom_changes = OOBTree()
+        key = (date.year, date.month)
+        changes = self.homeroom_changes.get(key)
+        if changes is None:
+            changes = self.homeroom_changes[key] = Length()
+        changes.change(1)
+
+    def getResolvedTargets(self):
+        """Cache of IEvaluateRequirement adapters by target key reference.
+
+        The cache is volatile, so it lives as long as this object stays
+        in the cache of a ZODB connection.
+        """
+        resolved = getattr(self, '_v_resolved_targets', None)
+        if resolved is None:
+            resolved = self._v_resolved_targets = {}
+        return resolved
+
+    def clearResolvedTargets(self):
+        self._v_resolved_targets = None
+
+    def getInstructorSectionIds(self, person, today=None):
+        """Return cached int ids of sections taught by a person.
+
+        See listInstructorSections.  Ids are listed again when the
+        instruction stamp or the date changes.
+        """
+        if today is None:
+            today = getUtility(IDateManager).today
+        key = (self.instruction_stamp, today)
+        cache = getattr(self, '_v_instructor_sections', None)
+        if cache is None or cache[0] != key:
+            cache = self._v_instructor_sections = key, {}
+        username = person.__name__
+        listing = cache[1].get(username)
+        if listing is None:
+            sections = IInstructor(removeSecurityProxy(person)).sections()
+            int_ids = getUtility(IIntIds)
+            listing = cache[1][username] = listInstructorSections(
+                sections, int_ids.getId)
+        return listing
+
+    def getUnstoredJournal(self, name):
+        """Return a new journal that is not stored in the container.
+
+        Unstored journals are not kept: schedule events do not reach
+        them, so their cached meetings would go stale.
+        """
+        journal = SectionJournalData()
+        journal.__name__ = name
+        return journal
+
+    def storeJournal(self, journal):
+        """Add an unstored journal, or return the journal stored instead."""
+        name = journal.__name__
+        stored = self.get(name)
+        if stored is None:
+            self[name] = stored = journal
+        return stored
+
+
+def getCourse(section):
+    try:
+        return list(section.courses)[0]
+    except (IndexError,):
+        return None
+
+
+def listInstructorSections(sections, getId):
+    """Group sections taught by an instructor by school years and terms.
+
+    Returns (section ids, [(year id, [(term id, [(section id, course id)])])])
+    of plain int ids, that can be shared between requests.  Years and
+    terms are sorted by their first day, sections keep their order.
+    """
+    section_ids = []
+    years = []
+    terms = {}
+    term_sections = {}
+    for section in sections:
+        section = removeSecurityProxy(section)
+        term = ITerm(section)
+        year = ISchoolYear(term)
+        if year not in terms:
+            years.append(year)
+            terms[year] = []
+        if term not in term_sections:
+            terms[year].append(term)
+            term_sections[term] = []
+        course = getCourse(section)
+        section_id = getId(section)
+        section_ids.append(section_id)
+        term_sections[term].append(
+            (section_id, course is not None and getId(course) or None))
+    years.sort(key=lambda year: year.first)
+    result = []
+    for year in years:
+        year_terms = sorted(terms[year], key=lambda term: term.first)
+        result.append((getId(year),
+                       [(getId(term), term_sections[term])
+                        for term in year_terms]))
+    return section_ids, result
+
+
+class InstructorNavigation(object):
+    """School years, terms and sections taught by an instructor.
+
+    Built for a request of int ids listed by listInstructorSections,
+    resolve returns the object of an int id, and getId the int id of
+    an object.
+    """
+
+    def __init__(self, listing, resolve, getId):
+        section_ids, years = listing
+        self.getId = getId
+        self.years = []
+        self.terms = {}
+        self._year_sections = {}
+        self._term_sections = {}
+        resolved = {}
+        for year_id, terms in years:
+            year = resolve(year_id)
+            if year is None:
+                continue
+            self.years.append(year)
+            self.terms[year_id] = []
+            self._year_sections[year_id] = []
+            for term_id, sections in terms:
+                term = resolve(term_id)
+                if term is None:
+                    continue
+                self.terms[year_id].append(term)
+                self._term_sections[term_id] = []
+                for section_id, course_id in sections:
+                    section = resolve(section_id)
+                    if section is None:
+                        continue
+                    resolved[section_id] = section
+                    self._year_sections[year_id].append(section)
+                    self._term_sections[term_id].append((section, course_id))
+        self.sections = [resolved[section_id] for section_id in section_ids
+                         if section_id in resolved]
+
+    def getCourse(self, section):
+        return getCourse(section)
+
+    def getTerms(self, year):
+        return self.terms.get(self.getId(year), [])
+
+    def getSections(self, term):
+        return [section for section, course_id
+                in self._term_sections.get(self.getId(term), [])]
+
+    def getYearSection(self, year):
+        """Return the first section taught in the school year."""
+        sections = self._year_sections.get(self.getId(year))
+        if not sections:
+            return None
+        return sections[0]
+
+    def getTermSection(self, term, course=None):
+        """Return the first section of the course taught in the term.
+
+        If no section of the course is taught in the term, return the
+        first section of the term.
+        """
+        sections = self._term_sections.get(self.getId(term))
+        if not sections:
+            return None
+        course_id = course is not None and self.getId(course) or None
+        for section, section_course_id in sections:
+            if section_course_id == course_id:
+                return section
+        return sections[0][0]
+
+
+def getInstructorNavigation(person):
+    """Return the navigation of a person with objects of this request."""
+    app = ISchoolToolApplication(None)
+    container = app['schooltool.lyceum.journal']
+    listing = container.getInstructorSectionIds(person)
+    int_ids = getUtility(IIntIds)
+
+    def resolve(int_id):
+        obj = int_ids.queryObject(int_id)
+        if obj is None:
+            return None
+        return ProxyFactory(obj)
+
+    def getId(obj):
+        return int_ids.queryId(removeSecurityProxy(obj))
+
+    return InstructorNavigation(listing, resolve, getId)
+
 
 @adapter(ISectionJournalData)
 @implementer(ISection)
@@ -256,29 +614,66 @@ def getSectionForSectionJournal(sj):
     return sj.section
 
 
-class EvaluateGeneric(object):
-    implements(IEvaluateRequirement)
-
-    def __init__(self, target):
-        self.context = target
+class EvaluateRequirementBase(object):
+    """Evaluation storage shared by requirement targets."""
 
-    def evaluate(self, person, requirement, grade, evaluator=None, score_system=None):
-        if score_system is None:
-            score_system = requirement.score_system
-        score = score_system.fromUnicode(grade)
-        evaluations = removeSecurityProxy(IEvaluations(person))
-
-        if requirement in evaluations:
-            current = evaluations[requirement]
+    def storeEvaluation(self, person, evaluations, requirement, score,
+                        evaluator=None, score_system=None):
+        current = evaluations.get(requirement)
+        if current is not None:
             if (current.value == score and
                 current.evaluator == evaluator):
-                return
+                return None
         else:
             if score is UNSCORED:
-                return
-
+                return None
         eval = Evaluation(requirement, score_system, score, evaluator=evaluator)
         evaluations.addEvaluation(eval)
+        self.evaluationChanged(person, requirement, current, eval)
+        return eval
+
+    def evaluationChanged(self, person, requirement, old, new):
+        pass
+
+    def evaluate(self, person, requirement, grade, evaluator=None, score_system=None):
+        if score_system is None:
+            score_system = requirement.score_system
+        score = score_system.fromUnicode(grade)
+        evaluations = removeSecurityProxy(IEvaluations(person))
+        self.storeEvaluation(person, evaluations, requirement, score,
+                             evaluator=evaluator, score_system=score_system)
+
+    def evaluateMany(self, evaluations, evaluator=None, score_system=None):
+        persons = []
+        cells = {}
+        for person, requirement, grade in evaluations:
+            if person not in cells:
+                persons.append(person)
+                cells[person] = []
+            cells[person].append((requirement, grade))
+
+        parsed = {}
+        errors = []
+        for person in persons:
+            person_evaluations = removeSecurityProxy(IEvaluations(person))
+            for requirement, grade in cells[person]:
+                ss = score_system
+                if ss is None:
+                    ss = requirement.score_system
+                key = (ss, grade)
+                if key not in parsed:
+                    try:
+                        parsed[key] = ss.fromUnicode(grade), None
+                    except ScoreValidationError, error:
+                        parsed[key] = None, error
+                score, error = parsed[key]
+                if error is not None:
+                    errors.append((person, requirement, grade, error))
+                    continue
+                self.storeEvaluation(person, person_evaluations,
+                                     requirement, score,
+                                     evaluator=evaluator, score_system=ss)
+        return errors
 
     def getEvaluation(self, person, requirement, default=None):
         evaluations = removeSecurityProxy(IEvaluations(person))
@@ -288,19 +683,135 @@ class EvaluateGeneric(object):
         return score
 
 
+class EvaluateGeneric(EvaluateRequirementBase):
+    implements(IEvaluateRequirement)
+
+    def __init__(self, target):
+        self.context = target
+
+    def evaluationChanged(self, person, requirement, old, new):
+        if not isinstance(requirement, SchoolMeetingRequirement):
+            return
+        app = ISchoolToolApplication(None)
+        container = app.get('schooltool.lyceum.journal')
+        if container is not None:
+            container.homeroomChanged(requirement.date)
+
+
+# Key references of requirement targets by database connection
+shared_target_refs = weakref.WeakKeyDictionary()
+
+
+def shareKeyReference(ref):
+    """Return the key reference equal to ref shared in its connection.
+
+    Requirements made or read in the same connection share the key
+    reference of their target.  Key references hold the object of the
+    connection they were made in, so they are not shared between
+    connections.
+    """
+    jar = getattr(getattr(ref, 'object', None), '_p_jar', None)
+    if jar is None:
+        return ref
+    try:
+        refs = shared_target_refs.setdefault(jar, {})
+    except TypeError:
+        return ref
+    return refs.setdefault(ref, ref)
+
+
+def getKeyReference(obj):
+    """Return the key reference of an object, made once per object.
+
+    Key references hold the object of the connection they were made in,
+    so the reference is cached on the object itself rather than once
+    per process.
+    """
+    obj = removeSecurityProxy(obj)
+    ref = getattr(obj, '_v_lyceum_journal_keyref', None)
+    if ref is None:
+        ref = shareKeyReference(IKeyReference(obj))
+        try:
+            obj._v_lyceum_journal_keyref = ref
+        except AttributeError:
+            pass
+    return ref
+
+
+def getApplicationKeyReference():
+    """Return the key reference of the application."""
+    return getKeyReference(ISchoolToolApplication(None))
+
+
+def internMeetingId(meeting_id):
+    if isinstance(meeting_id, unicode):
+        try:
+            meeting_id = meeting_id.encode('ascii')
+        except UnicodeEncodeError:
+            return meeting_id
+    if isinstance(meeting_id, str):
+        return intern(meeting_id)
+    return meeting_id
+
+
+def makeMeetingRequirement(cls, type_code, ordinal, meeting_id, target_ref):
+    """Make a meeting requirement from its compact key.
+
+    Stored requirements are unpickled with this function, so it must
+    stay importable.
+    """
+    if target_ref is not None:
+        target_ref = shareKeyReference(target_ref)
+    key = (type_code, ordinal, internMeetingId(meeting_id), target_ref)
+    return tuple.__new__(cls, key)
+
+
 class MeetingRequirement(tuple):
+    """Evaluation key of a meeting.
+
+    Keys are compact (type code, date ordinal, meeting id, target key
+    reference) tuples that compare and hash as plain tuples, so they
+    sort by type code first.  Requirements stored before generation 6
+    sorted by the requirement type name instead, with attendance before
+    grade, and keep the requirement type and the date itself until
+    generation 6 re-keys the BTrees that hold them.
+
+    A requirement made with a score system other than the default of
+    its class carries it, as generation 4 expects, but it is stored and
+    compared as the plain key.
+    """
     implements(IKeyReference)
 
+    __slots__ = ()
+
     key_type_id  = 'schooltool.lyceum.journal.journal.MeetingRequirement'
     requirement_type = None
+    type_code = 0
     score_system = None
 
     def __new__(cls, meeting, score_system=None):
         params = cls.getMeetingParams(meeting)
-        inst = tuple.__new__(cls, params)
-        if score_system is not None:
-            inst.score_system = score_system
-        return inst
+        if score_system is None or score_system is cls.score_system:
+            return makeMeetingRequirement(cls, *params)
+        requirement = makeMeetingRequirement(cls.withScoreSystem(), *params)
+        requirement.score_system = score_system
+        return requirement
+
+    @classmethod
+    def withScoreSystem(cls):
+        """A subclass with instances that can carry a score system."""
+        scored = cls.__dict__.get('_scored_class')
+        if scored is None:
+            scored = type(cls.__name__, (cls, ), {
+                '__module__': cls.__module__,
+                'key_class': cls,
+                })
+            cls._scored_class = scored
+        return scored
+
+    @property
+    def key_class(self):
+        return self.__class__
 
     @classmethod
     def getMeetingParams(cls, meeting):
@@ -311,18 +822,35 @@ class MeetingRequirement(tuple):
         try:
             calendar = meeting.__parent__
             target = calendar.__parent__
-            target_ref = IKeyReference(target)
+            target_ref = getKeyReference(target)
         except TypeError:
             target_ref = None
-        return (cls.requirement_type, date, meeting_id, target_ref)
+        return (cls.type_code, date.toordinal(), meeting_id, target_ref)
+
+    def __reduce__(self):
+        return (makeMeetingRequirement, (self.key_class, ) + tuple(self))
+
+    def __setstate__(self, state):
+        # Requirements stored before generation 6 may have pickled
+        # their score system
+        pass
 
-    def __cmp__(self, other):
-        if self.key_type_id == other.key_type_id:
-            return cmp(tuple(self), tuple(other))
-        return cmp(self.key_type_id, other.key_type_id)
+    def isCompact(self):
+        return isinstance(self[0], int)
+
+    def compact(self):
+        """Return the requirement as a compact key."""
+        if self.isCompact():
+            return self
+        type_code, date, meeting_id, target_ref = self
+        return makeMeetingRequirement(
+            self.key_class, self.type_code, date.toordinal(),
+            meeting_id, target_ref)
 
     @property
     def date(self):
+        if self.isCompact():
+            return datetime.date.fromordinal(self[1])
         return self[1]
 
     @property
@@ -343,37 +871,269 @@ class MeetingRequirement(tuple):
 class SchoolMeetingRequirement(MeetingRequirement):
     implements(IKeyReference)
 
+    __slots__ = ()
+
     key_type_id  = 'schooltool.lyceum.journal.journal.SchoolMeetingRequirement'
 
     @classmethod
     def getMeetingParams(cls, meeting):
         date = meeting.dtstart.date()
-        target_ref = IKeyReference(ISchoolToolApplication(None))
-        return (cls.requirement_type, date, None, target_ref)
+        target_ref = getApplicationKeyReference()
+        return (cls.type_code, date.toordinal(), None, target_ref)
 
 
 class GradeRequirement(MeetingRequirement):
+    __slots__ = ()
     requirement_type = 'grade'
+    type_code = 1
     score_system = TenPointScoreSystem
 
 
 class AttendanceRequirement(MeetingRequirement):
+    __slots__ = ()
     requirement_type = 'attendance'
+    type_code = 2
     score_system = AbsenceScoreSystem
 
 
 class HomeroomRequirement(SchoolMeetingRequirement):
+    __slots__ = ()
     requirement_type = 'homeroom'
+    type_code = 3
     score_system = AbsenceScoreSystem
 
 
-class SectionJournalData(Persistent):
+class StudentTotals(Persistent):
+    """Running counts of scores of a student in a section journal.
+
+    Scores are counted by (requirement type, score system, value), so
+    that totals can be computed with the current score system tags.
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def update(self, requirement_type, evaluation, delta):
+        if evaluation is None or evaluation.value is UNSCORED:
+            return
+        key = (requirement_type, evaluation.scoreSystem, evaluation.value)
+        count = self.counts.get(key, 0) + delta
+        if count > 0:
+            self.counts[key] = count
+        else:
+            self.counts.pop(key, None)
+        self._p_changed = True
+
+    def tally(self, requirement_type='attendance'):
+        """Return the AttendanceTally of attendance scores."""
+        tally = AttendanceTally()
+        for (key_type, ss, value), count in self.counts.items():
+            if key_type == requirement_type:
+                tally.addValue(ss, value, count=count)
+        return tally
+
+    def attendance(self, requirement_type='attendance'):
+        """Return (absent, tardy, excused, excusable) counts."""
+        tally = self.tally(requirement_type)
+        return tally.absent, tally.tardy, tally.excused, tally.excusable
+
+    def grades(self, requirement_type='grade'):
+        """Return (sum, count) of numerical grade values."""
+        total = 0
+        graded = 0
+        for (key_type, ss, value), count in self.counts.items():
+            if key_type != requirement_type:
+                continue
+            try:
+                grade = getNumericalValue(ss, value)
+            except KeyError:
+                continue
+            total += grade * count
+            graded += count
+        return total, graded
+
+
+class AttendanceTally(object):
+    """Counts of attendance scores of a student.
+
+    Scores are counted by value in tags, and by the absent, tardy and
+    excused classes of their score system.  Meetings of each class are
+    listed as (date, meeting_id) if the tally keeps meetings.
+    """
+
+    def __init__(self, keep_meetings=False):
+        self.tags = {}
+        self.absent = 0
+        self.tardy = 0
+        self.excused = 0
+        self.excusable = 0
+        self.meetings = None
+        if keep_meetings:
+            self.meetings = {'absent': [], 'tardy': [], 'excused': []}
+
+    def add(self, evaluation, date=None, meeting_id=None):
+        if evaluation is None:
+            return
+        self.addValue(evaluation.scoreSystem, evaluation.value,
+                      date=date, meeting_id=meeting_id)
+
+    def addValue(self, ss, value, count=1, date=None, meeting_id=None):
+        if (value is UNSCORED or
+            not IAttendanceScoreSystem.providedBy(ss)):
+            return
+        lookup = ss.lookup
+        self.tags[value] = self.tags.get(value, 0) + count
+        classes = []
+        if value in lookup.absent:
+            self.absent += count
+            classes.append('absent')
+        if value in lookup.tardy:
+            self.tardy += count
+            classes.append('tardy')
+        if value in lookup.excused:
+            self.excused += count
+            classes.append('excused')
+        if classes:
+            self.excusable += count
+        if self.meetings is not None:
+            for name in classes:
+                self.meetings[name].append((date, meeting_id))
+
+
+class ScoredMeeting(tuple):
+    """A score of a student in a meeting, classified by its score system.
+
+    Plain data, so that it can be shared between requests.
+    """
+    __slots__ = ()
+
+    def __new__(cls, requirement, evaluation):
+        ss = evaluation.scoreSystem
+        value = evaluation.value
+        numerical = None
+        absent = tardy = excused = False
+        if value is not UNSCORED:
+            if IAttendanceScoreSystem.providedBy(ss):
+                lookup = ss.lookup
+                absent = value in lookup.absent
+                tardy = value in lookup.tardy
+                excused = value in lookup.excused
+            else:
+                try:
+                    numerical = getNumericalValue(ss, value)
+                except KeyError:
+                    pass
+        return tuple.__new__(cls, (requirement.date, requirement.meeting_id,
+                                   value, numerical, absent, tardy, excused))
+
+    date = property(lambda self: self[0])
+    meeting_id = property(lambda self: self[1])
+    value = property(lambda self: self[2])
+    numerical = property(lambda self: self[3])
+    absent = property(lambda self: self[4])
+    tardy = property(lambda self: self[5])
+    excused = property(lambda self: self[6])
+
+
+def tallyAttendance(persons, requirements, keep_meetings=False):
+    """Count attendance scores of persons for the requirements.
+
+    Returns a dict of {username: AttendanceTally}.
+    """
+    requirements = sorted(set(requirements))
+    result = {}
+    for person in persons:
+        person = removeSecurityProxy(person)
+        tally = result[person.__name__] = AttendanceTally(keep_meetings)
+        evaluations = removeSecurityProxy(IEvaluations(person))
+        for requirement in requirements:
+            tally.add(evaluations.get(requirement),
+                      date=requirement.date,
+                      meeting_id=requirement.meeting_id)
+    return result
+
+
+class SectionMeetingIndex(object):
+    """Date sorted meetings of a section calendar.
+
+    Meetings sharing a meeting_id (consecutive periods) are listed once,
+    and grouped by their local date and month.
+    """
+
+    def __init__(self, calendar, timezone):
+        self.timezone = timezone
+        self.events = sorted(calendar, key=lambda e: e.dtstart)
+        self.meetings = []
+        self.by_id = {}
+        self.by_date = {}
+        self.by_month = {}
+        self.local_starts = {}
+        self.periods = {}
+        meeting_ids = set()
+        for event in self.events:
+            self.by_id.setdefault(event.unique_id, event)
+            meeting_id = event.meeting_id
+            if meeting_id is None:
+                meeting_id = event.unique_id
+            self.periods.setdefault(meeting_id, []).append(event)
+            if event.meeting_id in meeting_ids:
+                continue
+            meeting_ids.add(event.meeting_id)
+            self.meetings.append(event)
+            start = event.dtstart.astimezone(timezone)
+            self.local_starts[event.unique_id] = start
+            self.by_date.setdefault(start.date(), []).append(event)
+            self.by_month.setdefault((start.year, start.month), []).append(event)
+        for event in self.meetings:
+            self.by_id.setdefault(event.__name__, event)
+            if event.meeting_id is not None:
+                self.by_id.setdefault(event.meeting_id, event)
+        self.months = sorted(self.by_month)
+
+    def find(self, meeting_id):
+        """Find a meeting by unique_id, name or meeting_id."""
+        return self.by_id[meeting_id]
+
+    def getDate(self, date):
+        return list(self.by_date.get(date, ()))
+
+    def getPeriods(self, meeting_id):
+        """Return all events of a meeting, one for every period."""
+        return list(self.periods.get(meeting_id, ()))
+
+    def getMonth(self, year, month):
+        return list(self.by_month.get((year, month), ()))
+
+    def localStart(self, event):
+        start = self.local_starts.get(event.unique_id)
+        if start is None:
+            start = event.dtstart.astimezone(self.timezone)
+        return start
+
+
+class SectionJournalData(Persistent, EvaluateRequirementBase):
     """A journal for a section."""
     implements(ISectionJournalData, ILocation)
 
+    # Journals created before the score index was introduced have
+    # no index until it is rebuilt (see generations/evolve5.py).
+    score_index = None
+    totals = None
+    # Calendar stamp of the meetings totals were counted for
+    totals_stamp = None
+    schedule_stamp = 0
+    # Bumped by evaluations, membership, schedule and student changes
+    change_stamp = 0
+    changed_on = None
+    # ((activity stamp of the journal container, calendar stamp),
+    #  takes homeroom attendance)
+    homeroom_flag = None
+
     def __init__(self):
         self.__parent__ = None
         self.__name__ = None
+        self.score_index = OOBTree()
+        self.totals = OOBTree()
 
     @property
     def section(self):
@@ -386,30 +1146,193 @@ class SectionJournalData(Persistent):
             entry_id = meeting.unique_id
         return (key, entry_id)
 
-    def evaluate(self, person, requirement, grade, evaluator=None, score_system=None):
-        if score_system is None:
-            score_system = requirement.score_system
-        score = score_system.fromUnicode(grade)
-        evaluations = removeSecurityProxy(IEvaluations(person))
+    def journalChanged(self):
+        self.change_stamp += 1
+        self.changed_on = time.time()
+        if self.__name__ is not None:
+            gradebook_fragments.invalidate(group=self.__name__)
+
+    def evaluationChanged(self, person, requirement, old, new):
+        journal = self.getStoredJournal()
+        journal.journalChanged()
+        journal.indexEvaluation(person, requirement, new)
+        if (journal.homeroom_flag is None or
+            journal.homeroom_flag[0] != journal.getHomeroomFlagKey()):
+            journal.updateHomeroomFlag()
+        if journal.totals is None:
+            return
+        if not journal.hasCurrentTotals():
+            # Meetings changed since the totals were counted
+            journal.recountTotals()
+            return
+        journal.totals_stamp = journal.getCalendarStamp()
+        totals = journal.totals.get(person.__name__)
+        if totals is None:
+            totals = journal.totals[person.__name__] = StudentTotals()
+        totals.update(requirement.requirement_type, old, -1)
+        totals.update(requirement.requirement_type, new, 1)
+
+    def getStoredJournal(self):
+        """Return the journal of the section stored in the container."""
+        if self.__parent__ is not None or self.__name__ is None:
+            return self
+        app = ISchoolToolApplication(None)
+        jc = app['schooltool.lyceum.journal']
+        return jc.storeJournal(self)
+
+    def indexEvaluation(self, person, requirement, evaluation):
+        if self.score_index is None:
+            return
+        key = (requirement.requirement_type,
+               requirement.date,
+               requirement.meeting_id)
+        scores = self.score_index.get(key)
+        if scores is None:
+            scores = self.score_index[key] = OOBTree()
+        scores[person.__name__] = evaluation
+
+    def iterScores(self, requirement_type, first=None, last=None):
+        if self.score_index is None:
+            return
+        min_key = (requirement_type, )
+        if first is not None:
+            min_key = (requirement_type, first)
+        for key, scores in self.score_index.items(min=min_key):
+            key_type, date, meeting_id = key
+            if (key_type != requirement_type or
+                (last is not None and date > last)):
+                break
+            yield date, meeting_id, scores
 
-        if requirement in evaluations:
-            current = evaluations[requirement]
-            if (current.value == score and
-                current.evaluator == evaluator):
-                return
-        else:
-            if score is UNSCORED:
-                return
+    def getScores(self, requirement_type, first=None, last=None):
+        if self.score_index is None:
+            return None
+        result = {}
+        for date, meeting_id, scores in self.iterScores(
+            requirement_type, first=first, last=last):
+            result[date, meeting_id] = dict(scores.items())
+        return result
 
-        eval = Evaluation(requirement, score_system, score, evaluator=evaluator)
-        evaluations.addEvaluation(eval)
+    def getMeetingKeys(self):
+        """Return a set of (date, meeting_id) of scheduled meetings."""
+        return set([self.descriptionKey(meeting)
+                    for meeting in self.getMeetingIndex().meetings])
+
+    def iterMeetingScores(self, requirement_type, first=None, last=None):
+        """Like iterScores, skipping meetings no longer scheduled."""
+        meetings = self.getMeetingKeys()
+        for date, meeting_id, scores in self.iterScores(
+            requirement_type, first=first, last=last):
+            if (date, meeting_id) in meetings:
+                yield date, meeting_id, scores
+
+    def hasCurrentTotals(self):
+        """Tell whether totals were counted for the current meetings."""
+        if self.totals is None:
+            return False
+        if self.totals_stamp is None:
+            # Nothing was counted yet
+            return not self.totals
+        return self.totals_stamp == self.getCalendarStamp()
 
-    def getEvaluation(self, person, requirement, default=None):
-        evaluations = removeSecurityProxy(IEvaluations(person))
-        score = evaluations.get(requirement)
-        if score is None:
-            return default
-        return score
+    def countTotals(self, usernames=None):
+        """Count {username: StudentTotals} of scheduled meetings.
+
+        Scores of all indexed students are counted if usernames is None.
+        """
+        result = {}
+        meetings = self.getMeetingKeys()
+        for key, scores in self.score_index.items():
+            requirement_type, date, meeting_id = key
+            if (date, meeting_id) not in meetings:
+                continue
+            for username, evaluation in scores.items():
+                if usernames is not None and username not in usernames:
+                    continue
+                totals = result.get(username)
+                if totals is None:
+                    totals = result[username] = StudentTotals()
+                totals.update(requirement_type, evaluation, 1)
+        return result
+
+    def recountTotals(self):
+        totals = OOBTree()
+        for username, student_totals in self.countTotals().items():
+            if student_totals.counts:
+                totals[username] = student_totals
+        self.totals = totals
+        self.totals_stamp = self.getCalendarStamp()
+
+    def getStudentTotals(self, person):
+        if self.totals is None:
+            return None
+        if self.hasCurrentTotals():
+            totals = self.totals.get(person.__name__)
+        else:
+            # Counted without storing, totals are recounted on write
+            totals = self.countTotals([person.__name__]).get(person.__name__)
+        if totals is None:
+            totals = StudentTotals()
+        return totals
+
+    def tallyAttendance(self, persons, first=None, last=None,
+                        keep_meetings=False):
+        if self.score_index is None:
+            requirements = [
+                AttendanceRequirement(removeSecurityProxy(meeting))
+                for meeting in self.getMeetingIndex().meetings]
+            requirements = [
+                requirement for requirement in requirements
+                if ((first is None or requirement.date >= first) and
+                    (last is None or requirement.date <= last))]
+            return tallyAttendance(persons, requirements,
+                                   keep_meetings=keep_meetings)
+        result = {}
+        for person in persons:
+            person = removeSecurityProxy(person)
+            result[person.__name__] = AttendanceTally(keep_meetings)
+        if (first is None and last is None and
+            not keep_meetings and self.hasCurrentTotals()):
+            for username, tally in result.items():
+                totals = self.totals.get(username)
+                if totals is not None:
+                    result[username] = totals.tally()
+            return result
+        for date, meeting_id, scores in self.iterMeetingScores(
+            'attendance', first=first, last=last):
+            for username, evaluation in scores.items():
+                tally = result.get(username)
+                if tally is not None:
+                    tally.add(evaluation, date=date, meeting_id=meeting_id)
+        return result
+
+    def getIndexedPersons(self):
+        """Return members of the section and persons scored before."""
+        section = self.section
+        persons = dict([(person.__name__, person)
+                        for person in section.members.all()])
+        if self.score_index is not None:
+            app = ISchoolToolApplication(None)
+            person_container = app['persons']
+            for scores in self.score_index.values():
+                for username in scores.keys():
+                    if username not in persons:
+                        person = person_container.get(username)
+                        if person is not None:
+                            persons[username] = person
+        return persons.values()
+
+    def rebuildIndex(self):
+        persons = self.getIndexedPersons()
+        self.score_index = OOBTree()
+        target = IKeyReference(self.section)
+        for person in persons:
+            evaluations = removeSecurityProxy(IEvaluations(person))
+            for requirement, evaluation in evaluations.items():
+                if (isinstance(requirement, MeetingRequirement) and
+                    requirement[3] == target):
+                    self.indexEvaluation(person, requirement, evaluation)
+        self.recountTotals()
 
     def setGrade(self, person, meeting, grade, evaluator=None):
         requirement = GradeRequirement(removeSecurityProxy(meeting))
@@ -456,33 +1379,95 @@ class SectionJournalData(Persistent):
             entry_id = meeting.unique_id
         return (date, entry_id)
 
+    def getCalendarStamp(self):
+        """Stamp of the schedules and the term of the section.
+
+        Holidays and school days of the term are edited without firing
+        schedule events, so the stored state of the term is part of it.
+        """
+        section = ISection(self, None)
+        term = None
+        if section is not None:
+            term = removeSecurityProxy(ITerm(section, None))
+        term_state = None
+        if isinstance(term, Persistent):
+            # Ghosts do not know their serial until they are loaded
+            term._p_activate()
+        if term is not None:
+            term_state = (getattr(term, '_p_serial', None),
+                          bool(getattr(term, '_p_changed', False)))
+        return (self.schedule_stamp, term_state)
+
+    def getMeetingIndex(self, timezone=None):
+        if timezone is None:
+            app = ISchoolToolApplication(None)
+            timezone = pytz.timezone(IApplicationPreferences(app).timezone)
+        key = (self.getCalendarStamp(), timezone.zone)
+        cached = getattr(self, '_v_meeting_index', None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        calendar = ISchoolToolCalendar(self.section)
+        index = SectionMeetingIndex(calendar, timezone)
+        self._v_meeting_index = key, index
+        return index
+
+    def schedulesChanged(self):
+        self.schedule_stamp += 1
+        self.journalChanged()
+        self._v_meeting_index = None
+        self.updateHomeroomFlag()
+        if self.totals is not None and self.score_index:
+            self.recountTotals()
+
+    def getActivityStamp(self):
+        app = ISchoolToolApplication(None)
+        container = app.get('schooltool.lyceum.journal')
+        return getattr(container, 'activity_stamp', 0)
+
+    def computeTakesHomeroomAttendance(self):
+        for meeting in self.getMeetingIndex().meetings:
+            period = getattr(meeting, 'period', None)
+            if period is not None and period.activity_type == 'homeroom':
+                return True
+        return False
+
+    def getHomeroomFlagKey(self):
+        return (self.getActivityStamp(), self.getCalendarStamp())
+
+    def updateHomeroomFlag(self):
+        self.homeroom_flag = (self.getHomeroomFlagKey(),
+                              self.computeTakesHomeroomAttendance())
+
+    @property
+    def takes_homeroom_attendance(self):
+        key = self.getHomeroomFlagKey()
+        if self.homeroom_flag is not None and self.homeroom_flag[0] == key:
+            return self.homeroom_flag[1]
+        # Stale or missing flag, compute it without writing
+        cached = getattr(self, '_v_homeroom_flag', None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        value = self.computeTakesHomeroomAttendance()
+        self._v_homeroom_flag = key, value
+        return value
+
     def recordedMeetings(self, person):
         result = []
-        unique_meetings = set()
-        calendar = ISchoolToolCalendar(self.section)
-        sorted_events = sorted(calendar, key=lambda e: e.dtstart)
         evaluations = removeSecurityProxy(IEvaluations(person))
-        for event in sorted_events:
+        for event in self.getMeetingIndex().meetings:
             requirement = GradeRequirement(removeSecurityProxy(event))
-            if (requirement in evaluations and
-                event.meeting_id not in unique_meetings):
+            if requirement in evaluations:
                 result.append(event)
-                unique_meetings.add(event.meeting_id)
         return result
 
     def gradedMeetings(self, person, requirement_factory=GradeRequirement):
         result = []
-        unique_meetings = set()
-        calendar = ISchoolToolCalendar(self.section)
-        sorted_events = sorted(calendar, key=lambda e: e.dtstart)
         evaluations = removeSecurityProxy(IEvaluations(person))
-        for event in sorted_events:
+        for event in self.getMeetingIndex().meetings:
             requirement = requirement_factory(removeSecurityProxy(event))
             score = evaluations.get(requirement)
-            if (requirement in evaluations and
-                event.meeting_id not in unique_meetings):
+            if score is not None:
                 result.append((event, score))
-                unique_meetings.add(event.meeting_id)
         return result
 
     def absentMeetings(self, person):
@@ -547,19 +1532,16 @@ class SectionJournal(object):
     def members(self):
         return self.section.members.all()
 
+    @property
+    def meeting_index(self):
+        sd = ISectionJournalData(removeSecurityProxy(self.section))
+        return sd.getMeetingIndex()
+
     @Lazy
     def meetings(self):
         """Ordered list of all meetings for this section with
            consecutive periods removed if the timetable is so configured."""
-        events = []
-        unique_meetings = set()
-        calendar = ISchoolToolCalendar(removeSecurityProxy(self.section))
-        sorted_events = sorted(calendar, key=lambda e: e.dtstart)
-        for event in sorted_events:
-            if event.meeting_id not in unique_meetings:
-                events.append(event)
-                unique_meetings.add(event.meeting_id)
-        return sorted(events)
+        return list(self.meeting_index.meetings)
 
     def recordedMeetings(self, person):
         """Ordered list of all recorded meetings for this person.
@@ -585,13 +1567,25 @@ class SectionJournal(object):
         return owner in ILearner(person).sections()
 
     def findMeeting(self, meeting_id):
-        calendar = ISchoolToolCalendar(removeSecurityProxy(self.section))
-        meeting = calendar.find(meeting_id)
-        return meeting
+        return self.meeting_index.find(meeting_id)
+
+    def getStudentTotals(self, person):
+        sd = ISectionJournalData(removeSecurityProxy(self.section))
+        return sd.getStudentTotals(person)
+
+    def tallyAttendance(self, persons, first=None, last=None,
+                        keep_meetings=False):
+        sd = ISectionJournalData(removeSecurityProxy(self.section))
+        return sd.tallyAttendance(persons, first=first, last=last,
+                                  keep_meetings=keep_meetings)
 
 
 def getSectionJournalData(section):
-    """Get the journal for the section."""
+    """Get the journal for the section.
+
+    Journals are not stored on read, a new journal is added to the
+    journal container when the first score is recorded.
+    """
     app = ISchoolToolApplication(None)
     jc = app['schooltool.lyceum.journal']
 
@@ -600,11 +1594,63 @@ def getSectionJournalData(section):
 
     journal = jc.get(section_id, None)
     if journal is None:
-        jc[section_id] = journal = SectionJournalData()
+        journal = jc.getUnstoredJournal(section_id)
 
     return journal
 
 
+def querySectionJournalData(section):
+    """Get the journal for the section if it was created."""
+    app = ISchoolToolApplication(None)
+    jc = app.get('schooltool.lyceum.journal')
+    if jc is None:
+        return None
+    int_ids = getUtility(IIntIds)
+    section_id = int_ids.queryId(section)
+    if section_id is None:
+        return None
+    return jc.get(str(section_id), None)
+
+
+def notifySectionSchedulesChanged(container):
+    owner = IHaveSchedule(container, None)
+    if not ISection.providedBy(owner):
+        return
+    journal = querySectionJournalData(owner)
+    if journal is not None:
+        journal.schedulesChanged()
+
+
+@adapter(ISchedule, IObjectMovedEvent)
+def scheduleMoved(schedule, event):
+    for container in (event.oldParent, event.newParent):
+        if container is not None:
+            notifySectionSchedulesChanged(container)
+
+
+@adapter(ISchedule, IObjectModifiedEvent)
+def scheduleModified(schedule, event):
+    if schedule.__parent__ is not None:
+        notifySectionSchedulesChanged(schedule.__parent__)
+
+
+def periodActivitiesChanged():
+    app = ISchoolToolApplication(None)
+    container = app.get('schooltool.lyceum.journal')
+    if container is not None:
+        container.activity_stamp += 1
+
+
+@adapter(IPeriod, IObjectModifiedEvent)
+def periodModified(period, event):
+    periodActivitiesChanged()
+
+
+@adapter(IPeriod, IObjectMovedEvent)
+def periodMoved(period, event):
+    periodActivitiesChanged()
+
+
 def getEventSectionJournal(event):
     """Get the section journal for a ScheduleCalendarEvent."""
     calendar = event.__parent__
@@ -616,12 +1662,15 @@ class JournalInit(InitBase):
 
     def __call__(self):
         self.app['schooltool.lyceum.journal'] = LyceumJournalContainer()
+        self.app[USER_PREFERENCES_KEY] = JournalUserPreferencesStore()
 
 
 class JournalAppStartup(StartUpBase):
     def __call__(self):
         if 'schooltool.lyceum.journal' not in self.app:
             self.app['schooltool.lyceum.journal'] = LyceumJournalContainer()
+        if USER_PREFERENCES_KEY not in self.app:
+            self.app[USER_PREFERENCES_KEY] = JournalUserPreferencesStore()
 
 
 class JournalEditorsCrowd(ConfigurableCrowd):
@@ -648,6 +1697,19 @@ class JournalXLSReportTask(XLSReportTask):
         XLSReportTask.context.fset(self, section)
 
 
+class XLSXReportTask(XLSReportTask):
+
+    default_filename = 'report.xlsx'
+    default_mimetype = ('application/vnd.openxmlformats-officedocument.'
+                        'spreadsheetml.sheet')
+
+
+class ZipReportTask(XLSReportTask):
+
+    default_filename = 'report.zip'
+    default_mimetype = 'application/zip'
+
+
 class JournalPDFReportTask(ReportTask):
 
     @property
@@ -665,7 +1727,104 @@ class JournalPDFReportTask(ReportTask):
 @adapter(MeetingRequirement)
 @implementer(IEvaluateRequirement)
 def getEvaluateRequirementForMeetingRequirement(requirement):
-    return IEvaluateRequirement(requirement.target)
+    target_ref = requirement[3]
+    app = ISchoolToolApplication(None)
+    container = app.get('schooltool.lyceum.journal')
+    if target_ref is None or container is None:
+        return IEvaluateRequirement(requirement.target)
+    resolved = container.getResolvedTargets()
+    evaluate = resolved.get(target_ref)
+    if evaluate is not None and isResolvedTargetValid(evaluate):
+        return evaluate
+    evaluate = IEvaluateRequirement(requirement.target)
+    if isResolvedTargetValid(evaluate):
+        resolved[target_ref] = evaluate
+    return evaluate
+
+
+def isResolvedTargetValid(evaluate):
+    if ISectionJournalData.providedBy(evaluate):
+        # Only journals stored in the container, removed journals
+        # lose their parent.
+        return evaluate.__parent__ is not None
+    return True
+
+
+def clearResolvedTargets():
+    app = ISchoolToolApplication(None)
+    container = app.get('schooltool.lyceum.journal')
+    if container is not None:
+        container.clearResolvedTargets()
+
+
+@adapter(ISection, IObjectRemovedEvent)
+def sectionRemoved(section, event):
+    clearResolvedTargets()
+
+
+@adapter(ISectionJournalData, IObjectRemovedEvent)
+def sectionJournalDataRemoved(journal, event):
+    clearResolvedTargets()
+
+
+def instructionChanged(event):
+    if event.rel_type != URIInstruction:
+        return
+    app = ISchoolToolApplication(None)
+    container = app.get('schooltool.lyceum.journal')
+    if container is not None:
+        container.instruction_stamp += 1
+
+
+@adapter(IRelationshipAddedEvent)
+def instructionAdded(event):
+    instructionChanged(event)
+
+
+@adapter(IRelationshipRemovedEvent)
+def instructionRemoved(event):
+    instructionChanged(event)
+
+
+def membershipChanged(event):
+    if event.rel_type != URIMembership:
+        return
+    group = event[URIGroup]
+    if not ISection.providedBy(group):
+        return
+    journal = querySectionJournalData(group)
+    if journal is not None:
+        journal.journalChanged()
+
+
+@adapter(IRelationshipAddedEvent)
+def membershipAdded(event):
+    membershipChanged(event)
+
+
+@adapter(IRelationshipRemovedEvent)
+def membershipRemoved(event):
+    membershipChanged(event)
+
+
+def learnerChanged(person):
+    """Stamp journals of sections that show names of the student."""
+    for section in ILearner(person).sections():
+        journal = querySectionJournalData(section)
+        if journal is not None:
+            journal.journalChanged()
+
+
+@adapter(IPerson, IObjectModifiedEvent)
+def personModified(person, event):
+    learnerChanged(person)
+
+
+@adapter(IDemographics, IObjectModifiedEvent)
+def demographicsModified(demographics, event):
+    person = getattr(demographics, '__parent__', None)
+    if IPerson.providedBy(person):
+        learnerChanged(person)
 
 
 @adapter(ISection)
@@ -0,0 +1,263 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2014 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Streaming spreadsheet writers of journal exports.
+
+Workbooks are built from an iterable of (title, rows) sheets, where rows
+are lists of (value, style) cells and style is None, 'header' or 'date'.
+Sheets are consumed one at a time while the workbook is saved, so only
+the sheet being written is kept around.
+"""
+import csv
+import datetime
+import decimal
+import math
+import re
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+
+SHEET_NAME_LENGTH = 31
+
+INVALID_SHEET_NAME_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+INVALID_XML_CHARS = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+EXCEL_EPOCH = datetime.date(1899, 12, 30)
+
+
+def sheetName(title, taken):
+    """Make a valid sheet name of title that is not in taken.
+
+    Names are compared case insensitively, as spreadsheets do.
+    """
+    name = INVALID_SHEET_NAME_CHARS.sub('_', title).strip() or u'Sheet'
+    taken = set(n.lower() for n in taken)
+    candidate = name[:SHEET_NAME_LENGTH]
+    n = 1
+    while candidate.lower() in taken:
+        n += 1
+        suffix = u'~%d' % n
+        candidate = name[:SHEET_NAME_LENGTH-len(suffix)] + suffix
+    return candidate
+
+
+def toUnicode(value):
+    if value is None:
+        return u''
+    if isinstance(value, str):
+        return value.decode('utf-8')
+    return unicode(value)
+
+
+class StreamingWorkbook(object):
+    """A workbook saved as a zip archive, sheet by sheet.
+
+    Like xlwt.Workbook, it has a save(stream) method, so it can be
+    returned by export views.
+    """
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+
+    def save(self, stream):
+        archive = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED)
+        names = []
+        for title, rows in self.sheets:
+            name = sheetName(toUnicode(title), names)
+            names.append(name)
+            with tempfile.NamedTemporaryFile() as sheet_file:
+                self.writeSheet(sheet_file, rows)
+                sheet_file.flush()
+                archive.write(sheet_file.name,
+                              self.sheetFilename(len(names), name))
+        self.writeIndex(archive, names)
+        archive.close()
+
+    def sheetFilename(self, n, name):
+        raise NotImplementedError("override this in subclasses")
+
+    def writeSheet(self, stream, rows):
+        raise NotImplementedError("override this in subclasses")
+
+    def writeIndex(self, archive, names):
+        pass
+
+
+class CSVZipWorkbook(StreamingWorkbook):
+    """A zip archive with a CSV file for every sheet."""
+
+    def sheetFilename(self, n, name):
+        return ('%02d-%s.csv' % (n, name)).encode('utf-8')
+
+    def formatValue(self, value):
+        if isinstance(value, datetime.date):
+            return value.isoformat()
+        return toUnicode(value).encode('utf-8')
+
+    def writeSheet(self, stream, rows):
+        writer = csv.writer(stream)
+        for row in rows:
+            writer.writerow([self.formatValue(value) for value, style in row])
+
+
+def columnName(col):
+    """Spreadsheet name of a zero based column number."""
+    name = ''
+    col += 1
+    while col:
+        col, rest = divmod(col - 1, 26)
+        name = chr(ord('A') + rest) + name
+    return name
+
+
+XLSX_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+XLSX_REL_NS = ('http://schemas.openxmlformats.org/officeDocument/2006/'
+               'relationships')
+XLSX_PKG_REL_NS = ('http://schemas.openxmlformats.org/package/2006/'
+                   'relationships')
+XLSX_CONTENT_TYPE = ('application/vnd.openxmlformats-officedocument.'
+                     'spreadsheetml.%s+xml')
+
+XLSX_STYLES = """\
+<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="%s">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="YYYY-MM-DD"/></numFmts>
+<fonts count="2"><font><sz val="10"/><name val="Arial"/></font>\
+<font><b/><sz val="10"/><name val="Arial"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill>\
+<fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border>\
+</borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>\
+</cellStyleXfs>
+<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>\
+<xf numFmtId="0" fontId="1" fillId="0" borderId="0" applyFont="1"/>\
+<xf numFmtId="164" fontId="1" fillId="0" borderId="0" applyFont="1" \
+applyNumberFormat="1"/></cellXfs>
+</styleSheet>
+""" % XLSX_NS
+
+
+class XLSXWorkbook(StreamingWorkbook):
+    """An Office Open XML workbook written in a single pass.
+
+    All cells share three styles, listed in XLSX_STYLES.  Strings are
+    written inline, so there is no shared string table to keep.
+    """
+
+    style_ids = {None: 0, 'header': 1, 'date': 2}
+
+    def sheetFilename(self, n, name):
+        return 'xl/worksheets/sheet%d.xml' % n
+
+    def formatNumber(self, value):
+        """Cell value of a number, None if value is not a finite number."""
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, long)):
+            return str(value)
+        if isinstance(value, float):
+            if math.isinf(value) or math.isnan(value):
+                return None
+            return repr(value)
+        if isinstance(value, decimal.Decimal):
+            if not value.is_finite():
+                return None
+            return str(value)
+        return None
+
+    def formatCell(self, ref, value, style):
+        style_id = self.style_ids[style]
+        if isinstance(value, datetime.datetime):
+            value = value.date()
+        if isinstance(value, datetime.date):
+            return '<c r="%s" s="%d"><v>%d</v></c>' % (
+                ref, style_id, (value - EXCEL_EPOCH).days)
+        number = self.formatNumber(value)
+        if number is not None:
+            return '<c r="%s" s="%d"><v>%s</v></c>' % (ref, style_id, number)
+        text = INVALID_XML_CHARS.sub(u'', toUnicode(value))
+        if not text:
+            if style_id:
+                return '<c r="%s" s="%d"/>' % (ref, style_id)
+            return ''
+        return ('<c r="%s" s="%d" t="inlineStr"><is><t xml:space="preserve">'
+                '%s</t></is></c>' % (ref, style_id,
+                                     escape(text).encode('utf-8')))
+
+    def writeSheet(self, stream, rows):
+        stream.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                     '<worksheet xmlns="%s"><sheetData>' % XLSX_NS)
+        for r, row in enumerate(rows):
+            cells = [self.formatCell('%s%d' % (columnName(col), r + 1),
+                                     value, style)
+                     for col, (value, style) in enumerate(row)]
+            if row:
+                stream.write('<row r="%d">%s</row>' % (r + 1, ''.join(cells)))
+        stream.write('</sheetData></worksheet>')
+
+    def writeIndex(self, archive, names):
+        if not names:
+            # Spreadsheets refuse to open workbooks without sheets
+            names.append(u'Sheet')
+            archive.writestr(self.sheetFilename(1, names[0]),
+                             '<?xml version="1.0" encoding="UTF-8"?>\n'
+                             '<worksheet xmlns="%s"><sheetData/></worksheet>'
+                             % XLSX_NS)
+        sheets = range(1, len(names) + 1)
+        archive.writestr('[Content_Types].xml', ''.join(
+            ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+             'content-types">'
+             '<Default Extension="rels" ContentType="application/'
+             'vnd.openxmlformats-package.relationships+xml"/>'
+             '<Default Extension="xml" ContentType="application/xml"/>'
+             '<Override PartName="/xl/workbook.xml" ContentType="%s"/>'
+             % (XLSX_CONTENT_TYPE % 'sheet.main'),
+             '<Override PartName="/xl/styles.xml" ContentType="%s"/>'
+             % (XLSX_CONTENT_TYPE % 'styles')] +
+            ['<Override PartName="/xl/worksheets/sheet%d.xml" '
+             'ContentType="%s"/>' % (n, XLSX_CONTENT_TYPE % 'worksheet')
+             for n in sheets] +
+            ['</Types>']))
+        archive.writestr('_rels/.rels',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="%s">'
+            '<Relationship Id="rId1" Type="%s/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+            % (XLSX_PKG_REL_NS, XLSX_REL_NS))
+        archive.writestr('xl/workbook.xml', ''.join(
+            ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             '<workbook xmlns="%s" xmlns:r="%s"><sheets>'
+             % (XLSX_NS, XLSX_REL_NS)] +
+            ['<sheet name=%s sheetId="%d" r:id="rId%d"/>'
+             % (quoteattr(name).encode('utf-8'), n, n)
+             for n, name in zip(sheets, names)] +
+            ['</sheets></workbook>']))
+        archive.writestr('xl/_rels/workbook.xml.rels', ''.join(
+            ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             '<Relationships xmlns="%s">' % XLSX_PKG_REL_NS] +
+            ['<Relationship Id="rId%d" Type="%s/worksheet" '
+             'Target="worksheets/sheet%d.xml"/>' % (n, XLSX_REL_NS, n)
+             for n in sheets] +
+            ['<Relationship Id="rId%d" Type="%s/styles" '
+             'Target="styles.xml"/>' % (len(names) + 1, XLSX_REL_NS),
+             '</Relationships>']))
+        archive.writestr('xl/styles.xml', XLSX_STYLES)
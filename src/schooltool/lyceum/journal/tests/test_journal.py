@@ -50,7 +50,17 @@ def doctest_SectionJournalData():
     """Tests for SectionJournalData
 
         >>> from schooltool.lyceum.journal.journal import SectionJournalData
-        >>> journal = SectionJournalData()
+
+        >>> scheduled = []
+        >>> class MeetingIndexStub(object):
+        ...     meetings = scheduled
+        >>> class JournalDataStub(SectionJournalData):
+        ...     def getActivityStamp(self):
+        ...         return 0
+        ...     def getMeetingIndex(self, timezone=None):
+        ...         return MeetingIndexStub()
+
+        >>> journal = JournalDataStub()
 
         >>> class SectionStub(object):
         ...     pass
@@ -156,6 +166,127 @@ def doctest_SectionJournalData():
         >>> journal.getGrade(person1, meeting)
         Decimal('5')
 
+    Scores are also indexed by requirement type, date and meeting id,
+    so that journal grids can read a month with a single range scan:
+
+        >>> def printScores(requirement_type, first=None, last=None):
+        ...     for date, meeting_id, scores in journal.iterScores(
+        ...             requirement_type, first=first, last=last):
+        ...         print date, meeting_id, sorted(
+        ...             [(name, ev.value) for name, ev in scores.items()])
+
+        >>> printScores('grade')
+        2011-05-05 double-meeting [('john', Decimal('7'))]
+        2011-05-05 some-unique-id [('john', Decimal('5'))]
+
+        >>> printScores('attendance')
+        2011-05-05 some-unique-id [('john', 'n')]
+
+        >>> meeting4 = MeetingStub('later-meeting',
+        ...                        date=datetime.date(2011, 05, 12))
+        >>> journal.setGrade(person2, meeting4, "6")
+
+        >>> printScores('grade', first=datetime.date(2011, 05, 06))
+        2011-05-12 later-meeting [('pete', Decimal('6'))]
+
+        >>> printScores('grade', last=datetime.date(2011, 05, 11))
+        2011-05-05 double-meeting [('john', Decimal('7'))]
+        2011-05-05 some-unique-id [('john', Decimal('5'))]
+
+        >>> journal.getScores('grade', first=datetime.date(2011, 05, 12))
+        {(datetime.date(2011, 5, 12), 'later-meeting'): {'pete': <...Evaluation...>}}
+
+    Many cells can be evaluated at once.  Invalid grades are returned
+    instead of being stored:
+
+        >>> from schooltool.lyceum.journal.journal import GradeRequirement
+        >>> errors = journal.evaluateMany([
+        ...     (person1, GradeRequirement(meeting4), "8"),
+        ...     (person2, GradeRequirement(meeting4), "8"),
+        ...     (person2, GradeRequirement(meeting), "bad"),
+        ...     ])
+
+        >>> [(person.__name__, grade) for person, req, grade, error in errors]
+        [('pete', 'bad')]
+
+        >>> journal.getGrade(person1, meeting4)
+        Decimal('8')
+
+        >>> journal.getGrade(person2, meeting4)
+        Decimal('8')
+
+        >>> print journal.getGrade(person2, meeting)
+        None
+
+        >>> printScores('grade', first=datetime.date(2011, 05, 12))
+        2011-05-12 later-meeting [('john', Decimal('8')), ('pete', Decimal('8'))]
+
+    The journal keeps running totals of student scores, so that term
+    averages and absence counts do not need to scan all evaluations:
+
+        >>> total, count = journal.getStudentTotals(person1).grades()
+        >>> count
+        3
+        >>> print "%.2f" % (float(total) / count)
+        6.67
+
+        >>> journal.getStudentTotals(person1).attendance()
+        (1, 0, 0, 1)
+
+    Totals follow changed scores:
+
+        >>> journal.setAbsence(person1, meeting, value='te')
+        >>> journal.getStudentTotals(person1).attendance()
+        (0, 1, 1, 1)
+
+        >>> journal.setGrade(person1, meeting4, "")
+        >>> journal.getStudentTotals(person1).grades()[1]
+        2
+
+        >>> journal.getStudentTotals(person2).attendance()
+        (0, 0, 0, 0)
+
+    Only scores of meetings in the section calendar are counted.  When
+    schedules of the section change, totals are recounted:
+
+        >>> journal.schedulesChanged()
+        >>> journal.getStudentTotals(person1).grades()
+        (0, 0)
+        >>> journal.getStudentTotals(person1).attendance()
+        (0, 0, 0, 0)
+
+        >>> scheduled.extend([meeting, meeting2, meeting4])
+        >>> journal.schedulesChanged()
+        >>> journal.getStudentTotals(person1).grades()[1]
+        2
+        >>> journal.getStudentTotals(person1).attendance()
+        (0, 1, 1, 1)
+
+    Holidays of the term change the calendar stamp without schedule
+    events.  Stale totals are not used, scores of scheduled meetings
+    are counted instead:
+
+        >>> del scheduled[0]
+        >>> journal.schedule_stamp += 1
+        >>> journal.hasCurrentTotals()
+        False
+        >>> journal.getStudentTotals(person1).grades()[1]
+        1
+        >>> journal.getStudentTotals(person1).attendance()
+        (0, 0, 0, 0)
+        >>> journal.tallyAttendance([person1])['john'].tardy
+        0
+
+    The next score recounts them:
+
+        >>> journal.setGrade(person2, meeting2, "9")
+        >>> journal.hasCurrentTotals()
+        True
+        >>> journal.getStudentTotals(person1).grades()[1]
+        1
+        >>> journal.getStudentTotals(person2).grades()[1]
+        2
+
     """
 
 
@@ -164,8 +295,8 @@ def doctest_getSectionJournalData():
 
         >>> from schooltool.lyceum.journal.journal import getSectionJournalData
 
-        >>> from zope.container.btree import BTreeContainer
-        >>> journal_container = BTreeContainer()
+        >>> from schooltool.lyceum.journal.journal import LyceumJournalContainer
+        >>> journal_container = LyceumJournalContainer()
         >>> class STAppStub(dict):
         ...     def __init__(self, context):
         ...         self['schooltool.lyceum.journal'] = journal_container
@@ -197,11 +328,59 @@ def doctest_getSectionJournalData():
         >>> journal.__name__ == str(id(section))
         True
 
-        >>> journal_container[str(id(section))] is journal
+    Reading does not store the journal in the container:
+
+        >>> str(id(section)) in journal_container
+        False
+
+    Unstored journals are not kept, a new one is returned every time:
+
+        >>> unstored = getSectionJournalData(section)
+        >>> unstored is journal
+        False
+        >>> unstored.__name__ == journal.__name__
         True
 
-    If we try to get the journal for the second time, we get the same
-    journal instance:
+    So meetings of a section without scores follow its calendar, even
+    though schedule events only reach stored journals:
+
+        >>> import pytz
+        >>> from schooltool.app.interfaces import IApplicationPreferences
+        >>> from schooltool.app.interfaces import ISchoolToolCalendar
+        >>> from schooltool.lyceum.journal.interfaces import ISectionJournalData
+        >>> from schooltool.lyceum.journal.journal import SectionJournal
+
+        >>> class PreferencesStub(object):
+        ...     timezone = 'UTC'
+        >>> provideAdapter(lambda app: PreferencesStub(), adapts=[STAppStub],
+        ...                provides=IApplicationPreferences)
+        >>> provideAdapter(getSectionJournalData, adapts=[SectionStub],
+        ...                provides=ISectionJournalData)
+
+        >>> class EventStub(object):
+        ...     def __init__(self, uid, day):
+        ...         self.unique_id = self.__name__ = self.meeting_id = uid
+        ...         self.dtstart = pytz.UTC.localize(
+        ...             datetime.datetime(2014, 1, day, 10))
+
+        >>> section_calendar = [EventStub('first', 6)]
+        >>> provideAdapter(lambda section: section_calendar,
+        ...                adapts=[SectionStub], provides=ISchoolToolCalendar)
+
+        >>> [e.unique_id for e in SectionJournal(section).meetings]
+        ['first']
+
+        >>> section_calendar.append(EventStub('second', 7))
+        >>> [e.unique_id for e in SectionJournal(section).meetings]
+        ['first', 'second']
+
+    The journal is stored when the first score is recorded:
+
+        >>> journal.getStoredJournal() is journal
+        True
+
+        >>> journal_container[str(id(section))] is journal
+        True
 
         >>> getSectionJournalData(section) is journal
         True
@@ -209,6 +388,127 @@ def doctest_getSectionJournalData():
     """
 
 
+def doctest_journal_navigation_state():
+    """Tests for journal navigation state of users
+
+        >>> from schooltool.lyceum.journal.journal import (
+        ...     JournalUserPreferencesStore, getCurrentJournalMode,
+        ...     setCurrentJournalMode, getCurrentEnrollmentMode)
+
+        >>> store = JournalUserPreferencesStore()
+        >>> class STAppStub(dict):
+        ...     def __init__(self, context):
+        ...         self['schooltool.lyceum.journal-user-prefs'] = store
+
+        >>> from schooltool.app.interfaces import ISchoolToolApplication
+        >>> provideAdapter(STAppStub, adapts=[None], provides=ISchoolToolApplication)
+
+        >>> from zope.annotation.interfaces import IAttributeAnnotatable
+        >>> from zope.annotation.attribute import AttributeAnnotations
+        >>> provideAdapter(AttributeAnnotations)
+
+        >>> class PersonStub(object):
+        ...     implements(IAttributeAnnotatable)
+        ...     __name__ = 'john'
+        >>> person = PersonStub()
+
+    Reading the state does not write anything:
+
+        >>> print getCurrentJournalMode(person)
+        None
+
+        >>> list(store.users.keys()), hasattr(person, '__annotations__')
+        ([], False)
+
+    The state is stored in the user preferences store, not in the
+    annotations of the person:
+
+        >>> setCurrentJournalMode(person, 'journal-mode-grades')
+        >>> getCurrentJournalMode(person)
+        'journal-mode-grades'
+
+        >>> list(store.users.keys()), hasattr(person, '__annotations__')
+        (['john'], False)
+
+        >>> print getCurrentEnrollmentMode(person)
+        None
+
+    """
+
+
+def doctest_getEvaluateRequirementForMeetingRequirement():
+    """Tests for getEvaluateRequirementForMeetingRequirement
+
+        >>> from schooltool.lyceum.journal.journal import LyceumJournalContainer
+        >>> from schooltool.lyceum.journal.journal import (
+        ...     getEvaluateRequirementForMeetingRequirement)
+        >>> from schooltool.lyceum.journal.journal import sectionRemoved
+        >>> from schooltool.lyceum.journal.interfaces import IEvaluateRequirement
+
+        >>> journal_container = LyceumJournalContainer()
+        >>> class STAppStub(dict):
+        ...     def __init__(self, context):
+        ...         self['schooltool.lyceum.journal'] = journal_container
+
+        >>> from schooltool.app.interfaces import ISchoolToolApplication
+        >>> provideAdapter(STAppStub, adapts=[None], provides=ISchoolToolApplication)
+
+        >>> class JournalStub(object):
+        ...     implements(ISectionJournalData)
+        ...     __parent__ = journal_container
+
+        >>> class SectionStub(object):
+        ...     journal = JournalStub()
+
+        >>> @adapter(SectionStub)
+        ... @implementer(IEvaluateRequirement)
+        ... def getJournal(section):
+        ...     print 'Resolving journal'
+        ...     return section.journal
+        >>> provideAdapter(getJournal)
+
+        >>> section = SectionStub()
+        >>> class KeyRefStub(object):
+        ...     def __call__(self):
+        ...         return section
+        >>> section_ref = KeyRefStub()
+
+        >>> class RequirementStub(tuple):
+        ...     @property
+        ...     def target(self):
+        ...         return self[3]()
+        >>> requirement = RequirementStub(('grade', None, None, section_ref))
+
+    Journals are resolved once per target key reference:
+
+        >>> getEvaluateRequirementForMeetingRequirement(requirement) is section.journal
+        Resolving journal
+        True
+
+        >>> getEvaluateRequirementForMeetingRequirement(requirement) is section.journal
+        True
+
+    Removed journals are not returned from the cache:
+
+        >>> section.journal.__parent__ = None
+        >>> getEvaluateRequirementForMeetingRequirement(requirement) is section.journal
+        Resolving journal
+        True
+
+        >>> section.journal.__parent__ = journal_container
+        >>> getEvaluateRequirementForMeetingRequirement(requirement) is section.journal
+        True
+
+    The cache is cleared when sections are removed:
+
+        >>> sectionRemoved(section, None)
+        >>> getEvaluateRequirementForMeetingRequirement(requirement) is section.journal
+        Resolving journal
+        True
+
+    """
+
+
 def doctest_SectionJournal():
     """Tests for SectionJournal adapter:
 
@@ -272,36 +572,814 @@ def doctest_SectionJournal():
 def doctest_SectionJournal_findMeeting():
     """Test for SectionJournal.findMeeting
 
+    Meetings of a section are looked up in the meeting index of its
+    journal data:
+
+        >>> import pytz
         >>> from schooltool.lyceum.journal.journal import SectionJournal
-        >>> from schooltool.app.interfaces import ISchoolToolCalendar
+        >>> from schooltool.lyceum.journal.journal import SectionMeetingIndex
+
+        >>> class EventStub(object):
+        ...     def __init__(self, uid, meeting_id, day):
+        ...         self.unique_id = self.__name__ = uid
+        ...         self.meeting_id = meeting_id
+        ...         self.dtstart = pytz.UTC.localize(
+        ...             datetime.datetime(2011, 5, day, 10))
+        ...     def __repr__(self):
+        ...         return '<Event uid=%s>' % self.unique_id
+
+        >>> calendar = [EventStub('second', 'meeting-2', 6),
+        ...             EventStub('first', 'meeting-1', 5),
+        ...             EventStub('first-double', 'meeting-1', 5)]
+        >>> index = SectionMeetingIndex(calendar, pytz.UTC)
+
+        >>> class SectionDataStub(object):
+        ...     def getMeetingIndex(self):
+        ...         return index
+        >>> section_data = SectionDataStub()
+
         >>> class SectionStub(object):
         ...     def __conform__(self, iface):
-        ...         if iface == ISchoolToolCalendar:
-        ...             return self.calendar
-        >>> class CalendarStub(object):
-        ...     events = []
-        ...     def find(self, event_id):
-        ...         if event_id in self.events:
-        ...             return "<Event uid=%s>" % event_id
-        ...         else:
-        ...             raise KeyError("Event not found!")
-        >>> section1 = SectionStub()
-        >>> section1.calendar = CalendarStub()
-        >>> section1.calendar.events = ["section-meeting"]
-        >>> sj = SectionJournal(section1)
+        ...         return section_data
+        >>> sj = SectionJournal(SectionStub())
+
+    Meetings are sorted by date, consecutive periods are listed once:
+
+        >>> sj.meetings
+        [<Event uid=first>, <Event uid=second>]
+
+        >>> index.months
+        [(2011, 5)]
+
+        >>> index.getDate(datetime.date(2011, 5, 5))
+        [<Event uid=first>]
 
     If there is no such meeting, a key error is raised:
 
         >>> sj.findMeeting("some-meeting-id")
         Traceback (most recent call last):
         ...
-        KeyError: 'Event not found!'
+        KeyError: 'some-meeting-id'
 
     But if we are looking for a meeting that belongs to the calendar
-    of the context section, we should get it:
+    of the context section, we should get it, either by unique id or
+    by meeting id:
+
+        >>> sj.findMeeting("first-double")
+        <Event uid=first-double>
+
+        >>> sj.findMeeting("meeting-2")
+        <Event uid=second>
+
+    """
+
+
+def doctest_SectionJournalData_takes_homeroom_attendance():
+    """Test for SectionJournalData.takes_homeroom_attendance
+
+        >>> import pytz
+        >>> from schooltool.lyceum.journal.journal import SectionJournalData
+        >>> from schooltool.lyceum.journal.journal import SectionMeetingIndex
+
+        >>> class PeriodStub(object):
+        ...     def __init__(self, activity_type):
+        ...         self.activity_type = activity_type
+
+        >>> class EventStub(object):
+        ...     def __init__(self, uid, period):
+        ...         self.unique_id = self.__name__ = self.meeting_id = uid
+        ...         self.period = period
+        ...         self.dtstart = pytz.UTC.localize(
+        ...             datetime.datetime(2011, 5, 5, 10))
+
+        >>> homeroom = PeriodStub('lesson')
+        >>> calendar = [EventStub('first', PeriodStub('lesson')),
+        ...             EventStub('second', homeroom)]
+
+        >>> stamps = {'activity': 0, 'calendar': 0}
+        >>> class JournalDataStub(SectionJournalData):
+        ...     def getActivityStamp(self):
+        ...         return stamps['activity']
+        ...     def getCalendarStamp(self):
+        ...         return stamps['calendar']
+        ...     def getMeetingIndex(self, timezone=None):
+        ...         print 'Expanding the calendar'
+        ...         return SectionMeetingIndex(calendar, pytz.UTC)
+
+        >>> jd = JournalDataStub()
+
+    Without a stored flag, the value is computed once and kept in a
+    volatile cache:
+
+        >>> print jd.homeroom_flag
+        None
+        >>> jd.takes_homeroom_attendance
+        Expanding the calendar
+        False
+        >>> jd.takes_homeroom_attendance
+        False
+
+    When schedules of the section change, the flag is stored:
+
+        >>> jd.schedulesChanged()
+        Expanding the calendar
+        >>> jd.homeroom_flag
+        ((0, 0), False)
+        >>> jd.takes_homeroom_attendance
+        False
+
+    Changing activity types of periods bumps the activity stamp, which
+    makes the stored flag stale:
+
+        >>> homeroom.activity_type = 'homeroom'
+        >>> stamps['activity'] += 1
+        >>> jd.takes_homeroom_attendance
+        Expanding the calendar
+        True
+
+        >>> jd.updateHomeroomFlag()
+        Expanding the calendar
+        >>> jd.homeroom_flag
+        ((1, 0), True)
+        >>> jd.takes_homeroom_attendance
+        True
+
+    The calendar stamp changes with the term too, e.g. when the only
+    homeroom meeting becomes a holiday.  That makes the stored flag
+    stale as well:
+
+        >>> del calendar[1]
+        >>> stamps['calendar'] += 1
+        >>> jd.takes_homeroom_attendance
+        Expanding the calendar
+        False
+
+    """
+
+
+def doctest_SectionJournalData_getCalendarStamp():
+    """Test for SectionJournalData.getCalendarStamp
+
+        >>> from persistent import Persistent
+        >>> from schooltool.term.interfaces import ITerm
+        >>> from schooltool.lyceum.journal.journal import SectionJournalData
+
+        >>> class TermStub(Persistent):
+        ...     pass
+        >>> class SectionStub(object):
+        ...     term = None
+
+        >>> section = SectionStub()
+        >>> provideAdapter(lambda jd: section, adapts=[SectionJournalData],
+        ...                provides=ISection)
+        >>> provideAdapter(lambda section: section.term, adapts=[SectionStub],
+        ...                provides=ITerm)
+
+        >>> jd = SectionJournalData()
+        >>> jd.getCalendarStamp()
+        (0, None)
+
+    Holidays and school days of the term are edited without firing
+    schedule events, so the stored state of the term is in the stamp:
+
+        >>> section.term = TermStub()
+        >>> before = jd.getCalendarStamp()
+        >>> section.term._p_serial = '\\x00' * 7 + '\\x01'
+        >>> jd.getCalendarStamp() == before
+        False
+
+    So are the schedules of the section:
+
+        >>> before = jd.getCalendarStamp()
+        >>> jd.schedule_stamp += 1
+        >>> jd.getCalendarStamp() == before
+        False
+
+    """
+
+
+def doctest_change_stamps():
+    """Tests for change stamps of journals
+
+        >>> from schooltool.lyceum.journal.journal import SectionJournalData
+        >>> from schooltool.lyceum.journal.journal import LyceumJournalContainer
+
+        >>> jd = SectionJournalData()
+        >>> jd.change_stamp, jd.changed_on
+        (0, None)
+
+        >>> jd.journalChanged()
+        >>> jd.change_stamp
+        1
+        >>> jd.changed_on is not None
+        True
 
-        >>> sj.findMeeting("section-meeting")
-        '<Event uid=section-meeting>'
+    Changes of homeroom evaluations are counted in the journal
+    container by month of their date, so that marking homeroom
+    attendance does not invalidate grids of other months:
+
+        >>> container = LyceumJournalContainer()
+        >>> container.getHomeroomStamp()
+        ()
+        >>> container.homeroomChanged(datetime.date(2014, 1, 20))
+        >>> container.homeroomChanged(datetime.date(2014, 1, 31))
+        >>> container.homeroomChanged(datetime.date(2014, 3, 1))
+        >>> container.getHomeroomStamp()
+        (((2014, 1), 2), ((2014, 3), 1))
+
+        >>> container.getHomeroomStamp(datetime.date(2014, 2, 1),
+        ...                            datetime.date(2014, 2, 28))
+        ()
+        >>> container.getHomeroomStamp(datetime.date(2014, 1, 1),
+        ...                            datetime.date(2014, 2, 28))
+        (((2014, 1), 2),)
+        >>> container.getHomeroomStamp(first=datetime.date(2014, 2, 1))
+        (((2014, 3), 1),)
+
+    """
+
+
+def doctest_InstructorNavigation():
+    """Test for InstructorNavigation
+
+        >>> from schooltool.schoolyear.interfaces import ISchoolYear
+        >>> from schooltool.term.interfaces import ITerm
+        >>> from schooltool.lyceum.journal.journal import InstructorNavigation
+        >>> from schooltool.lyceum.journal.journal import listInstructorSections
+
+        >>> class YearStub(object):
+        ...     def __init__(self, title, first):
+        ...         self.title, self.first = title, first
+        ...     def __repr__(self):
+        ...         return '<Year %s>' % self.title
+
+        >>> class TermStub(YearStub):
+        ...     def __init__(self, title, first, year):
+        ...         YearStub.__init__(self, title, first)
+        ...         self.year = year
+        ...     def __conform__(self, iface):
+        ...         if iface is ISchoolYear:
+        ...             return self.year
+        ...     def __repr__(self):
+        ...         return '<Term %s>' % self.title
+
+        >>> class SectionStub(object):
+        ...     def __init__(self, title, term, *courses):
+        ...         self.title, self.term, self.courses = title, term, courses
+        ...     def __conform__(self, iface):
+        ...         if iface is ITerm:
+        ...             return self.term
+        ...     def __repr__(self):
+        ...         return '<Section %s>' % self.title
+
+        >>> y2011 = YearStub('2011', datetime.date(2011, 9, 1))
+        >>> y2010 = YearStub('2010', datetime.date(2010, 9, 1))
+        >>> spring = TermStub('Spring', datetime.date(2012, 2, 1), y2011)
+        >>> fall = TermStub('Fall', datetime.date(2011, 9, 1), y2011)
+        >>> old = TermStub('Old', datetime.date(2010, 9, 1), y2010)
+
+        >>> sections = [SectionStub('history-2', spring, 'history'),
+        ...             SectionStub('math-2', spring, 'math'),
+        ...             SectionStub('math-1', fall, 'math'),
+        ...             SectionStub('math-0', old, 'math'),
+        ...             SectionStub('empty', old)]
+
+    Sections are listed by int ids, which can be shared between
+    requests:
+
+        >>> objects = {}
+        >>> def getId(obj):
+        ...     for int_id, known in objects.items():
+        ...         if known is obj:
+        ...             return int_id
+        ...     objects[len(objects) + 1] = obj
+        ...     return len(objects)
+
+        >>> listing = listInstructorSections(sections, getId)
+        >>> ids = dict([(obj, int_id) for int_id, obj in objects.items()])
+        >>> section_ids, years = listing
+        >>> [objects[section_id] for section_id in section_ids]
+        [<Section history-2>, <Section math-2>, <Section math-1>,
+         <Section math-0>, <Section empty>]
+        >>> [(objects[year_id], [objects[term_id] for term_id, s in terms])
+        ...  for year_id, terms in years]
+        [(<Year 2010>, [<Term Old>]), (<Year 2011>, [<Term Fall>, <Term Spring>])]
+
+    The navigation resolves them to objects of the request.  Objects
+    that are gone are skipped:
+
+        >>> del objects[ids[sections[2]]]
+        >>> nav = InstructorNavigation(listing, objects.get, ids.get)
+        >>> nav.sections
+        [<Section history-2>, <Section math-2>, <Section math-0>,
+         <Section empty>]
+
+    Years and terms are sorted by their first day, sections keep their
+    order:
+
+        >>> nav.years
+        [<Year 2010>, <Year 2011>]
+        >>> nav.getTerms(y2011)
+        [<Term Fall>, <Term Spring>]
+        >>> nav.getSections(old)
+        [<Section math-0>, <Section empty>]
+        >>> nav.getTerms(YearStub('2009', None))
+        []
+        >>> nav.getSections(fall)
+        []
+
+    Year selectors link to the first section taught in the year:
+
+        >>> nav.getYearSection(y2011)
+        <Section history-2>
+
+    Term selectors prefer a section of the same course:
+
+        >>> nav.getTermSection(spring, 'math')
+        <Section math-2>
+        >>> nav.getTermSection(spring, None)
+        <Section history-2>
+        >>> nav.getTermSection(old, None)
+        <Section empty>
+
+    """
+
+
+def doctest_AttendanceScoreSystem():
+    """Tests for AttendanceScoreSystem
+
+        >>> from schooltool.requirement.evaluation import Evaluation
+        >>> from schooltool.requirement.scoresystem import ScoreValidationError
+        >>> from schooltool.lyceum.journal.journal import AttendanceScoreSystem
+
+        >>> ss = AttendanceScoreSystem('Attendance')
+        >>> ss.scoresDict == dict(ss.scores)
+        True
+
+    Scores are parsed regardless of their case:
+
+        >>> ss.isValidScore('AE'), ss.isValidScore('x')
+        (True, False)
+        >>> ss.fromUnicode(u'Ae')
+        'ae'
+        >>> ss.fromUnicode(u'x')
+        Traceback (most recent call last):
+        ...
+        ScoreValidationError: x
+
+        >>> def score(value):
+        ...     return Evaluation(None, ss, value, None)
+        >>> ss.isAbsent(score('ae')), ss.isTardy(score('ae')), ss.isExcused(score('ae'))
+        (True, False, True)
+
+    Lookup tables are compiled again when scores or tags are set:
+
+        >>> lookup = ss.lookup
+        >>> ss.lookup is lookup
+        True
+
+        >>> ss.scores = ss.scores + (('x', 'Excused'), )
+        >>> ss.tag_excused = ss.tag_excused + ('x', )
+        >>> ss.lookup is lookup
+        False
+        >>> ss.fromUnicode(u'X')
+        'x'
+        >>> ss.isExcused(score('x')), ss.isAbsent(score('x'))
+        (True, False)
+
+    """
+
+
+def doctest_getNumericalValue():
+    """Tests for getNumericalValue
+
+        >>> from schooltool.lyceum.journal.journal import getNumericalValue
+
+        >>> class ScoreSystemStub(object):
+        ...     def __init__(self, scores):
+        ...         self.scores = scores
+        ...     def getNumericalValue(self, value):
+        ...         print 'Looking up', value
+        ...         return dict(self.scores)[value]
+
+        >>> ss = ScoreSystemStub([('A', 4), ('B', 3)])
+
+    Numerical values are looked up once:
+
+        >>> getNumericalValue(ss, 'A')
+        Looking up A
+        4
+        >>> getNumericalValue(ss, 'A')
+        4
+
+    Unknown values raise a KeyError every time:
+
+        >>> getNumericalValue(ss, 'X')
+        Traceback (most recent call last):
+        ...
+        KeyError: 'X'
+        >>> getNumericalValue(ss, 'X')
+        Traceback (most recent call last):
+        ...
+        KeyError: 'X'
+
+    The table is built again when scores are set:
+
+        >>> ss.scores = [('A', 5)]
+        >>> getNumericalValue(ss, 'A')
+        Looking up A
+        5
+
+    """
+
+
+def doctest_AttendanceTally():
+    """Tests for AttendanceTally
+
+        >>> from schooltool.requirement.evaluation import Evaluation
+        >>> from schooltool.requirement.scoresystem import UNSCORED
+        >>> from schooltool.lyceum.journal.journal import AttendanceScoreSystem
+        >>> from schooltool.lyceum.journal.journal import AttendanceTally
+
+        >>> ss = AttendanceScoreSystem('Attendance')
+        >>> tally = AttendanceTally(keep_meetings=True)
+
+    Scores are counted by value and by their classes:
+
+        >>> d = datetime.date(2011, 5, 5)
+        >>> tally.add(Evaluation(None, ss, 'a', None), d, 'meeting-1')
+        >>> tally.add(Evaluation(None, ss, 'ae', None), d, 'meeting-2')
+        >>> tally.add(Evaluation(None, ss, 't', None), d, 'meeting-3')
+        >>> tally.add(Evaluation(None, ss, UNSCORED, None), d, 'meeting-4')
+        >>> tally.add(None, d, 'meeting-5')
+        >>> tally.addValue(ss, 'a', count=2)
+
+        >>> sorted(tally.tags.items())
+        [('a', 3), ('ae', 1), ('t', 1)]
+        >>> tally.absent, tally.tardy, tally.excused, tally.excusable
+        (4, 1, 1, 5)
+
+        >>> tally.meetings['absent']
+        [(datetime.date(2011, 5, 5), 'meeting-1'),
+         (datetime.date(2011, 5, 5), 'meeting-2'),
+         (None, None), (None, None)]
+        >>> tally.meetings['tardy']
+        [(datetime.date(2011, 5, 5), 'meeting-3')]
+        >>> tally.meetings['excused']
+        [(datetime.date(2011, 5, 5), 'meeting-2')]
+
+    Scores of other score systems are ignored:
+
+        >>> class ScoreSystemStub(object):
+        ...     pass
+        >>> tally.addValue(ScoreSystemStub(), 'a')
+        >>> tally.absent
+        4
+
+    """
+
+
+def doctest_ScoredMeeting():
+    """Tests for ScoredMeeting
+
+        >>> from schooltool.requirement.evaluation import Evaluation
+        >>> from schooltool.lyceum.journal.journal import AttendanceScoreSystem
+        >>> from schooltool.lyceum.journal.journal import ScoredMeeting
+
+        >>> class RequirementStub(object):
+        ...     date = datetime.date(2011, 5, 5)
+        ...     meeting_id = 'meeting-1'
+        >>> class ScoreSystemStub(object):
+        ...     scores = [('A', 4)]
+        ...     def getNumericalValue(self, value):
+        ...         return dict(self.scores)[value]
+
+    Scores are classified when they are made:
+
+        >>> ss = AttendanceScoreSystem('Attendance')
+        >>> score = ScoredMeeting(RequirementStub(),
+        ...                       Evaluation(None, ss, 'ae', None))
+        >>> score
+        (datetime.date(2011, 5, 5), 'meeting-1', 'ae', None, True, False, True)
+        >>> score.absent, score.tardy, score.excused
+        (True, False, True)
+
+        >>> score = ScoredMeeting(RequirementStub(),
+        ...                       Evaluation(None, ScoreSystemStub(), 'A', None))
+        >>> score.value, score.numerical, score.absent
+        ('A', 4, False)
+
+    """
+
+
+def doctest_LRUCache():
+    """Tests for LRUCache
+
+        >>> from schooltool.lyceum.journal.cache import LRUCache
+
+        >>> cache = LRUCache(10)
+        >>> cache.set('a', 'xxxx')
+        >>> cache.set('b', 'yyyy')
+        >>> print cache.get('c')
+        None
+        >>> cache.get('a')
+        'xxxx'
+
+    Least recently used values are evicted when the budget is exceeded:
+
+        >>> cache.set('c', 'zzzz')
+        >>> sorted(cache.data.keys())
+        ['a', 'c']
+        >>> cache.size
+        8
+
+    Values over the budget are not cached:
+
+        >>> cache.set('d', 'too large value')
+        >>> print cache.get('d')
+        None
+
+        >>> cache.invalidate(lambda key: key == 'a')
+        >>> sorted(cache.data.keys())
+        ['c']
+
+    Values can be set in groups, which are invalidated without scanning
+    keys of other groups:
+
+        >>> cache.set(('j1', 1), 'x', group='j1')
+        >>> cache.set(('j1', 2), 'y', group='j1')
+        >>> cache.set(('j2', 1), 'z', group='j2')
+        >>> cache.invalidate(lambda key: key[1] != 2, group='j1')
+        >>> sorted(cache.data.keys())
+        ['c', ('j1', 2), ('j2', 1)]
+
+        >>> cache.invalidate(group='j1')
+        >>> sorted(cache.data.keys())
+        ['c', ('j2', 1)]
+        >>> sorted(cache.groups.items())
+        [('j2', set([('j2', 1)]))]
+
+    Evicted values leave their group too:
+
+        >>> cache.set('e', 'wwwwwwwwww')
+        >>> sorted(cache.data.keys()), cache.groups
+        (['e'], {})
+
+        >>> sorted(cache.stats().items())
+        [('budget', 10), ('entries', 1), ('evictions', 3),
+         ('hit_rate', 0.333...), ('hits', 1), ('invalidations', 3),
+         ('misses', 2), ('size', 10)]
+
+    """
+
+
+def doctest_StreamingWorkbook():
+    """Tests for streaming workbooks of journal exports
+
+        >>> from schooltool.lyceum.journal.spreadsheet import sheetName
+        >>> from schooltool.lyceum.journal.spreadsheet import columnName
+        >>> from schooltool.lyceum.journal.spreadsheet import CSVZipWorkbook
+        >>> from schooltool.lyceum.journal.spreadsheet import XLSXWorkbook
+
+    Sheet names are cleaned up, cut to 31 characters and kept unique:
+
+        >>> sheetName(u'Attendance-a/b', [])
+        u'Attendance-a_b'
+        >>> sheetName(u'x' * 40, [u'x' * 31])
+        u'xxxxxxxxxxxxxxxxxxxxxxxxxxxxx~2'
+
+        >>> [columnName(n) for n in (0, 25, 26, 27, 701, 702)]
+        ['A', 'Z', 'AA', 'AB', 'ZZ', 'AAA']
+
+    Sheets are consumed one by one while the workbook is saved:
+
+        >>> def sheets():
+        ...     for name in ['One', 'one']:
+        ...         print 'writing', name
+        ...         yield name, [[(u'ID', 'header'),
+        ...                       (datetime.date(2014, 1, 2), 'date')],
+        ...                      [],
+        ...                      [(u'x & y', None), (3, None)]]
+
+        >>> import zipfile
+        >>> from StringIO import StringIO
+        >>> stream = StringIO()
+        >>> CSVZipWorkbook(sheets()).save(stream)
+        writing One
+        writing one
+        >>> archive = zipfile.ZipFile(stream)
+        >>> archive.namelist()
+        ['01-One.csv', '02-one~2.csv']
+        >>> print archive.read('01-One.csv')
+        ID,2014-01-02
+        <BLANKLINE>
+        x & y,3
+
+        >>> stream = StringIO()
+        >>> XLSXWorkbook(sheets()).save(stream)
+        writing One
+        writing one
+        >>> archive = zipfile.ZipFile(stream)
+        >>> sorted(archive.namelist())
+        ['[Content_Types].xml', '_rels/.rels', 'xl/_rels/workbook.xml.rels',
+         'xl/styles.xml', 'xl/workbook.xml',
+         'xl/worksheets/sheet1.xml', 'xl/worksheets/sheet2.xml']
+        >>> print archive.read('xl/worksheets/sheet1.xml')
+        <?xml ...?>
+        <worksheet ...><sheetData><row r="1"><c r="A1" s="1" t="inlineStr"><is><t
+        xml:space="preserve">ID</t></is></c><c r="B1" s="2"><v>41641</v></c></row><row
+        r="3"><c r="A3" s="0" t="inlineStr"><is><t xml:space="preserve">x &amp;
+        y</t></is></c><c r="B3" s="0"><v>3</v></c></row></sheetData></worksheet>
+        >>> print archive.read('xl/workbook.xml')
+        <?xml ...?>
+        <workbook ...><sheets><sheet name="One" sheetId="1" r:id="rId1"/><sheet
+        name="one~2" sheetId="2" r:id="rId2"/></sheets></workbook>
+
+    Numbers are written as numbers, the rest as text:
+
+        >>> import decimal
+        >>> workbook = XLSXWorkbook([])
+        >>> for value in [5, 5L, 2.5, decimal.Decimal('4.50'), float('nan'),
+        ...               decimal.Decimal('NaN'), True]:
+        ...     print workbook.formatCell('A1', value, None)
+        <c r="A1" s="0"><v>5</v></c>
+        <c r="A1" s="0"><v>5</v></c>
+        <c r="A1" s="0"><v>2.5</v></c>
+        <c r="A1" s="0"><v>4.50</v></c>
+        <c r="A1" s="0" t="inlineStr"><is><t xml:space="preserve">nan</t></is></c>
+        <c r="A1" s="0" t="inlineStr"><is><t xml:space="preserve">NaN</t></is></c>
+        <c r="A1" s="0" t="inlineStr"><is><t xml:space="preserve">True</t></is></c>
+
+    """
+
+
+def doctest_MeetingRequirement():
+    """Tests for MeetingRequirement
+
+        >>> import cPickle
+        >>> from schooltool.lyceum.journal.journal import GradeRequirement
+        >>> from schooltool.lyceum.journal.journal import AttendanceRequirement
+
+        >>> class CalendarStub(object):
+        ...     __parent__ = object()
+
+        >>> class MeetingStub(object):
+        ...     __parent__ = CalendarStub()
+        ...     dtstart = datetime.datetime(2011, 5, 5, 10)
+        ...     meeting_id = u'meeting-1'
+
+    Requirements are stored as compact keys:
+
+        >>> requirement = GradeRequirement(MeetingStub())
+        >>> requirement
+        (1, 734262, 'meeting-1', None)
+        >>> requirement.requirement_type, requirement.date, requirement.meeting_id
+        ('grade', datetime.date(2011, 5, 5), 'meeting-1')
+
+    Instances have no __dict__, keys compare and hash as plain tuples:
+
+        >>> hasattr(requirement, '__dict__')
+        False
+        >>> from schooltool.lyceum.journal.journal import TenPointScoreSystem
+        >>> requirement.score_system is TenPointScoreSystem
+        True
+
+        >>> restored = cPickle.loads(cPickle.dumps(requirement, 1))
+        >>> restored
+        (1, 734262, 'meeting-1', None)
+        >>> type(restored) is GradeRequirement
+        True
+        >>> restored == requirement, hash(restored) == hash(requirement)
+        (True, True)
+
+    A requirement can be made with another score system, as generation
+    4 does.  It carries the score system, but is the same key and is
+    stored as a plain requirement:
+
+        >>> scored = GradeRequirement(MeetingStub(), score_system='custom')
+        >>> scored.score_system
+        'custom'
+        >>> scored == requirement, hash(scored) == hash(requirement)
+        (True, True)
+        >>> restored = cPickle.loads(cPickle.dumps(scored, 1))
+        >>> type(restored) is GradeRequirement
+        True
+        >>> restored.score_system is TenPointScoreSystem
+        True
+
+    Requirement types of the same meeting differ:
+
+        >>> AttendanceRequirement(MeetingStub()) == requirement
+        False
+
+    School meeting requirements sort after section meeting requirements:
+
+        >>> from schooltool.lyceum.journal.journal import HomeroomRequirement
+        >>> HomeroomRequirement.key_type_id > GradeRequirement.key_type_id
+        True
+        >>> HomeroomRequirement.type_code > AttendanceRequirement.type_code
+        True
+
+    Requirements stored before generation 6 can still be read and
+    compacted:
+
+        >>> legacy = tuple.__new__(
+        ...     GradeRequirement,
+        ...     ('grade', datetime.date(2011, 5, 5), u'meeting-1', None))
+        >>> legacy.isCompact(), legacy.date
+        (False, datetime.date(2011, 5, 5))
+        >>> legacy.compact()
+        (1, 734262, 'meeting-1', None)
+        >>> legacy.compact() == requirement
+        True
+
+    """
+
+
+def doctest_shareKeyReference():
+    """Tests for shareKeyReference
+
+        >>> from schooltool.lyceum.journal.journal import shareKeyReference
+        >>> from schooltool.lyceum.journal.journal import GradeRequirement
+        >>> from schooltool.lyceum.journal.journal import makeMeetingRequirement
+
+        >>> class ConnectionStub(object):
+        ...     pass
+
+        >>> class SectionStub(object):
+        ...     def __init__(self, oid, jar):
+        ...         self._p_oid = oid
+        ...         self._p_jar = jar
+
+        >>> class KeyReferenceStub(object):
+        ...     def __init__(self, obj):
+        ...         self.object = obj
+        ...     def __hash__(self):
+        ...         return hash(self.object._p_oid)
+        ...     def __eq__(self, other):
+        ...         return self.object._p_oid == other.object._p_oid
+
+    Equal key references of one connection are shared:
+
+        >>> connection = ConnectionStub()
+        >>> section = SectionStub('oid1', connection)
+        >>> ref = KeyReferenceStub(section)
+        >>> shareKeyReference(ref) is ref
+        True
+        >>> shareKeyReference(KeyReferenceStub(section)) is ref
+        True
+
+    Requirements read from the database share their target reference too:
+
+        >>> one = makeMeetingRequirement(GradeRequirement, 1, 734262, 'm1',
+        ...                              KeyReferenceStub(section))
+        >>> two = makeMeetingRequirement(GradeRequirement, 1, 734262, 'm2',
+        ...                              KeyReferenceStub(section))
+        >>> one[3] is two[3] is ref
+        True
+
+    Other connections have their own references:
+
+        >>> other = KeyReferenceStub(SectionStub('oid1', ConnectionStub()))
+        >>> shareKeyReference(other) is other
+        True
+
+    """
+
+
+def doctest_getApplicationKeyReference():
+    """Test for getApplicationKeyReference
+
+        >>> from schooltool.app.interfaces import ISchoolToolApplication
+        >>> from schooltool.lyceum.journal.journal import getApplicationKeyReference
+        >>> from schooltool.lyceum.journal.journal import HomeroomRequirement
+
+        >>> class AppStub(object):
+        ...     pass
+        >>> app = AppStub()
+        >>> provideAdapter(lambda context: app, adapts=[None],
+        ...                provides=ISchoolToolApplication)
+
+        >>> def makeKeyReference(app):
+        ...     print 'Making a key reference'
+        ...     return KeyReferenceStub(app)
+        >>> provideAdapter(makeKeyReference, adapts=(AppStub, ),
+        ...                provides=IKeyReference)
+
+    The key reference is made once for the application object:
+
+        >>> ref = getApplicationKeyReference()
+        Making a key reference
+        >>> getApplicationKeyReference() is ref
+        True
+
+    And shared by requirements of school meetings:
+
+        >>> class MeetingStub(object):
+        ...     dtstart = datetime.datetime(2011, 5, 5, 10)
+        >>> requirement = HomeroomRequirement(MeetingStub())
+        >>> requirement[3] is ref
+        True
 
     """
 